@@ -0,0 +1,343 @@
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+from botbot.actor import Actor, TimerNode, ActionNode, ActionSequence, WaitAction, RectangleNode, LineNode, SpriteNode
+from botbot.render import NullBackend, set_backend, flush
+from botbot.animation import Animator
+from botbot.timeline import TimelineNode, Sequence, Wait, Tween
+from botbot.games.horses import _poisson_disc_sampling, HorseNode, _HORSE_SHEET
+from botbot.scene import FiniteStateMachine
+from botbot import raylib as assets
+from slimrr import Vector2
+import pyray as r
+
+_BENCHMARKS = {}
+
+def benchmark(name: str, window: bool = False):
+    def decorator(func):
+        _BENCHMARKS[name] = (func, window)
+        return func
+    return decorator
+
+def _measure(run, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        reported = run()
+        # benchmarks that time a subprocess report their own milliseconds
+        times.append(reported if isinstance(reported, float) else (perf_counter() - start) * 1000.)
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "max_ms": max(times), "runs": repeat}
+
+def _tree(count: int, fanout: int = 10):
+    root = Actor(name="root")
+    level = [root]
+    made = 0
+    while made < count:
+        next_level = []
+        for parent in level:
+            for _ in range(fanout):
+                if made >= count:
+                    break
+                child = Actor(name=f"n{made % 100}")
+                parent.add_child(child)
+                next_level.append(child)
+                made += 1
+        level = next_level
+    return root
+
+for _count in (1_000, 10_000, 100_000):
+    def _traverse(count=_count):
+        root = _tree(count)
+        def run():
+            root.step(1. / 60.)
+            root.draw()
+        return run
+    benchmark(f"tree_traversal_{_count}")(_traverse)
+
+@benchmark("find_children_10000")
+def _find_children():
+    root = Actor()
+    for i in range(10_000):
+        root.add_child(Actor(name=f"n{i % 100}"))
+    def run():
+        for i in range(100):
+            root.find_children(f"n{i}")
+            root.find_child(f"n{i}")
+    return run
+
+@benchmark("timer_step_10000")
+def _timers():
+    root = Actor()
+    for _ in range(10_000):
+        root.add_child(TimerNode(duration=1e9, repeat=True))
+    def run():
+        root.step(1. / 60.)
+    return run
+
+class _Target(Actor):
+    value: float = 0.
+
+@benchmark("action_step_1000")
+def _actions():
+    root = Actor()
+    for _ in range(1_000):
+        target = _Target()
+        target.value = 0.
+        root.add_child(ActionNode(actor=target, field="value", target=1., duration=1e9))
+    def run():
+        root.step(1. / 60.)
+    return run
+
+@benchmark("action_sequence_step_1000")
+def _sequences():
+    root = Actor()
+    for _ in range(1_000):
+        target = _Target()
+        target.value = 0.
+        root.add_child(ActionSequence(actions=[WaitAction(duration=1e-9),
+                                               ActionNode(actor=target, field="value", target=1., duration=1e9)]))
+    root.step(1. / 60.)
+    def run():
+        root.step(1. / 60.)
+    return run
+
+@benchmark("timeline_step_1000")
+def _timelines():
+    root = Actor()
+    for _ in range(1_000):
+        target = _Target()
+        target.value = 0.
+        root.add_child(TimelineNode(Sequence([Wait(1e-9), Tween(target, "value", 1., duration=1e9)])))
+    root.step(1. / 60.)
+    def run():
+        root.step(1. / 60.)
+    return run
+
+@benchmark("sprite_animation_step_1000")
+def _animation():
+    animator = Animator()
+    sprites = [SpriteNode() for _ in range(1_000)]
+    for sprite in sprites:
+        animator.play(sprite, _HORSE_SHEET, "Galloping")
+    def run():
+        animator.step(1. / 60.)
+    return run
+
+class _HorseStates(FiniteStateMachine):
+    states = HorseNode.states
+    transitions = HorseNode.transitions
+
+    def start_race(self):
+        pass
+
+@benchmark("fsm_construct_1000")
+def _fsm_construct():
+    def run():
+        for _ in range(1_000):
+            fsm = _HorseStates()
+            fsm.idle()
+            fsm.race()
+    return run
+
+@benchmark("poisson_disc_uncached")
+def _poisson():
+    return lambda: _poisson_disc_sampling(1024, 768, 50)
+
+@benchmark("poisson_disc_cached")
+def _poisson_cached():
+    _poisson_disc_sampling(1024, 768, 50, seed=0)
+    return lambda: _poisson_disc_sampling(1024, 768, 50, seed=0)
+
+@benchmark("find_file_1000")
+def _find_file():
+    root = tempfile.mkdtemp()
+    for folder in ("textures", "horses"):
+        os.makedirs(os.path.join(root, "assets", folder))
+        for i in range(50):
+            open(os.path.join(root, "assets", folder, f"{i}.png"), "w").close()
+    os.chdir(root)
+    assets.scan_assets()
+    names = [f"{i % 50}" for i in range(1_000)]
+    def run():
+        for name in names:
+            assets.find_file(name, [".png"], ["textures"])
+    def cleanup():
+        # the index now describes the temp dir, later benchmarks must resolve against the real assets
+        assets.clear_asset_index()
+        shutil.rmtree(root, ignore_errors=True)
+    return run, cleanup
+
+@benchmark("draw_submit_10000")
+def _draw_submit():
+    root = Actor()
+    for i in range(10_000):
+        if i % 2:
+            root.add_child(RectangleNode(width=16, height=16))
+        else:
+            root.add_child(LineNode(end=Vector2([16, 16])))
+    def run():
+        # headless, commands are recorded and then discarded
+        previous = set_backend(NullBackend())
+        root.draw()
+        flush()
+        set_backend(previous)
+    return run
+
+@benchmark("capture_copy_1024x768")
+def _capture_copy():
+    import numpy as np
+    from botbot.capture import SharedMemoryRing
+    ring = SharedMemoryRing(1024, 768)
+    atexit.register(ring.close)
+    pixels = np.zeros(1024 * 768 * 4, dtype=np.uint8)
+    def run():
+        # the cpu side of a capture, flipping a read back frame into the next ring slot
+        frame = ring.acquire()
+        np.copyto(frame, pixels.reshape(768, 1024, 4)[::-1])
+        ring.commit(frame)
+    return run
+
+@benchmark("pool_bet_10000")
+def _pool_bets():
+    from botbot.pool import BettingPool
+    bets = [(random.randrange(8), random.randint(1, 500)) for _ in range(10_000)]
+    def run():
+        pool = BettingPool(8)
+        for outcome, amount in bets:
+            pool.bet(outcome, amount)
+        pool.publish()
+    return run
+
+@benchmark("horse_races_enter", window=True)
+def _horse_races():
+    from botbot.games.horses import HorseRaces
+    def run():
+        scene = HorseRaces()
+        scene.enter()
+        assets.unload_cache()
+    return run
+
+def _python(code: str, *flags: str):
+    return subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True, check=True)
+
+@benchmark("import_botbot")
+def _import_botbot():
+    def run():
+        # fresh interpreter each run, -X importtime reports the cumulative microseconds of `import botbot`
+        stderr = _python("import botbot", "-X", "importtime").stderr
+        for line in stderr.splitlines():
+            if line.rstrip().endswith("| botbot"):
+                return int(line.split("|")[1]) / 1000.
+    return run
+
+_FIRST_FRAME = """
+from time import perf_counter
+start = perf_counter()
+import pyray as r
+from botbot.scene import find_scene
+from botbot.render import flush
+from botbot import games
+r.set_config_flags(r.FLAG_WINDOW_HIDDEN)
+r.init_window(1024, 768, "botbot-bench")
+scene = find_scene("HorseRaces")()
+scene.activate()
+r.begin_drawing()
+scene.draw()
+flush()
+r.end_drawing()
+print((perf_counter() - start) * 1000.)
+r.close_window()
+"""
+
+# the subprocess opens its own hidden window, so this runs without --window
+@benchmark("time_to_first_frame")
+def _first_frame():
+    return lambda: float(_python(_FIRST_FRAME).stdout.strip().splitlines()[-1])
+
+# cold start targets in milliseconds, checked on every run that includes the benchmark, --budget overrides them
+_BUDGETS = {
+    "import_botbot": 500.,
+    "time_to_first_frame": 1500.,
+}
+
+def _compare(results: dict, baseline: dict, threshold: float):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["median_ms"], result["median_ms"]
+        ratio = after / before if before else float("inf")
+        print(f"{name:32} {before:10.3f}ms -> {after:10.3f}ms  x{ratio:.2f}")
+        if ratio > 1. + threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="botbot benchmarks")
+    parser.add_argument("-o", "--output", default="bench_output.json", help="where to save results")
+    parser.add_argument("-b", "--baseline", help="previous results to compare against")
+    parser.add_argument("-t", "--threshold", type=float, default=.1, help="allowed slowdown before failing")
+    parser.add_argument("-r", "--repeat", type=int, default=10)
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks containing this")
+    parser.add_argument("--budget", action="append", default=[], metavar="NAME=MS",
+                        help="fail when a benchmark's median exceeds MS, e.g. import_botbot=300, overrides the defaults")
+    parser.add_argument("--window", action="store_true", help="open a hidden window for benchmarks that need a GL context")
+    args = parser.parse_args()
+    if args.window:
+        r.set_config_flags(r.FLAG_WINDOW_HIDDEN)
+        r.init_window(1024, 768, "botbot-bench")
+    cwd = os.getcwd()
+    results = {}
+    failed = []
+    for name, (setup, window) in _BENCHMARKS.items():
+        if args.filter not in name or (window and not args.window):
+            continue
+        cleanup = None
+        try:
+            run = setup()
+            # benchmarks that change global state return a cleanup alongside their run
+            if isinstance(run, tuple):
+                run, cleanup = run
+            results[name] = _measure(run, args.repeat)
+        except subprocess.CalledProcessError as e:
+            # e.g. no display for the first frame's window, a budget that can't be checked counts as missed
+            print(f"{name} failed: exit status {e.returncode}")
+            failed.append(name)
+            continue
+        finally:
+            os.chdir(cwd)
+            if cleanup is not None:
+                cleanup()
+        print(f"{name:32} {results[name]['median_ms']:10.3f}ms")
+    if args.window:
+        r.close_window()
+    with open(args.output, "w") as f:
+        json.dump({"meta": {"python": sys.version, "platform": platform.platform()}, "results": results}, f, indent=1)
+    budgets = dict(_BUDGETS)
+    for budget in args.budget:
+        name, limit = budget.split("=")
+        budgets[name] = float(limit)
+    for name, limit in budgets.items():
+        if name in results and results[name]["median_ms"] > limit:
+            print(f"{name} is over budget: {results[name]['median_ms']:.3f}ms > {limit:.3f}ms")
+            failed.append(name)
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = _compare(results, json.load(f)["results"], args.threshold)
+        if regressions:
+            print("Regressed:", ", ".join(regressions))
+            failed += regressions
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,29 @@
+from __future__ import annotations
 import asyncio
-from .games import *
-from typing import Optional, Union
-from twitchAPI.twitch import Twitch
-from twitchAPI.oauth import UserAuthenticator
-from twitchAPI.chat import Chat, EventData, ChatMessage, ChatCommand, ChatSub, AuthScope, ChatEvent
-from redis import Redis
+from . import games
+from typing import Optional, Union, TYPE_CHECKING
 import pyray as r
-from pony.orm import *
-from .scene import Scene, Transition
-from .raylib import unload_cache
+from .scene import Scene, Transition, find_scene
+from .actor import clear_text_runs
+from time import perf_counter
+from .raylib import unload_cache, scan_assets, load_manifest, missing_assets, mount_bundle, unmount_bundle, Keyboard, poll_input
+from .audio import stop_audio_thread
+from .render import RenderTarget, set_render_target
+from .pool import PoolClosedError
 import random
-import sys
+import json
+import os
 
-__ALL__ = ["DefaultBot", "BotBot", "HorseRaces", "Roulette"]
+# twitchAPI, pony and redis are only imported by the subsystems that use them
+if TYPE_CHECKING:
+    from twitchAPI.chat import EventData, ChatCommand
 
-_DATABASE = Database()
-_CACHE = None
-_DEFAULT_BALANCE = 1000
+__ALL__ = ["DefaultBot", "BotBot", "HorseRaces", "Roulette"]
 
-class Player(_DATABASE.Entity):
-    id = PrimaryKey(int, auto=True)
-    uid = Required(int, unique=True)
-    balance = Required(int, default=_DEFAULT_BALANCE)
+def __getattr__(name):
+    if name in games.__all__:
+        return getattr(games, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class Bet:
     def __init__(self, player, amount, multiplier=1.):
@@ -49,30 +51,9 @@ class InsufficientBalanceError(Exception):
     def __str__(self):
         return f"Cannot place bet for `${self.amount}`, only `${self.total}` available"
 
-def _find_user(uid: int) -> Player:
-    with db_session:
-        return Player.get(uid=uid)
-
-def _create_user(uid: int) -> Player:
-    if _find_user(uid) is not None:
-        raise AlreadyRegisteredError()
-    with db_session:
-        return Player(uid=uid)
-
-def _user_stake(uid: int) -> int:
-    if (_CACHE.hexists("stakes", str(uid))):
-        return int(_CACHE.hget("stakes", str(uid)))
-    else:
-        return 0
-
-def _clear_stakes():
-    _CACHE.delete("stakes")
-
 def _connect_database():
-    global _DATABASE, _CACHE
-    _DATABASE.bind(provider="sqlite", filename="botbot.db", create_db=True)
-    _DATABASE.generate_mapping(create_tables=True)
-    _CACHE = Redis("localhost", 6379, 0)
+    from .database import _connect_database
+    _connect_database()
 
 def _read_file(s: str | None) -> str:
     if s is None:
@@ -88,6 +69,7 @@ class BotBot(Scene):
         super().__init__(**kwargs)
         self._scene = None
         self._last_scene = None
+        self._warm_scenes = {}
         self.chat = None
         self.twitch = None
         self.app_id = _read_file(app_id)
@@ -96,12 +78,22 @@ class BotBot(Scene):
         self.app_access = _read_file(app_access)
     
     async def quit(self):
+        for scene in self._warm_scenes.values():
+            scene.exit()
+        self._warm_scenes = {}
+        stop_audio_thread()
+        set_render_target(None)
+        unload_cache()
+        clear_text_runs()
+        unmount_bundle()
         r.close_audio_device()
         r.close_window()
         # self.chat.stop()
         # await self.twitch.close()
 
     async def run(self):
+        # from twitchAPI.twitch import Twitch
+        # from twitchAPI.chat import Chat, AuthScope, ChatEvent
         # _connect_database()
         # user_scopes = [AuthScope.CHAT_READ, AuthScope.CHAT_EDIT]
         # self.twitch = await Twitch(client_id=self.app_id, client_secret=self.app_secret)
@@ -113,6 +105,19 @@ class BotBot(Scene):
         # self.chat.register_command("bet", self.on_bet)
         # self.chat.start()
 
+        if "manifest" in self.config:
+            load_manifest(self.config['manifest'])
+            missing = missing_assets()
+            if missing:
+                raise RuntimeError(f"Missing assets: {', '.join(missing)}")
+        else:
+            scan_assets()
+        if "bundle" in self.config:
+            mount_bundle(self.config['bundle'])
+        if self.config.get("headless"):
+            # offscreen under mesa's software rasterizer, for capture tests on machines without a GPU
+            os.environ.setdefault("LIBGL_ALWAYS_SOFTWARE", "1")
+            r.set_config_flags(r.ConfigFlags.FLAG_WINDOW_HIDDEN | self.config.get('flags', 0))
         r.init_window(self.config['width'] if "width" in self.config else 1024,
                       self.config['height'] if "height" in self.config else 768,
                       self.config['title'] if "title" in self.config else "BotBot")
@@ -122,13 +127,71 @@ class BotBot(Scene):
             r.set_target_fps(self.config['fps'])
         if "exit_key" in self.config:
             r.set_exit_key(self.config['exit_key'])
+        capture = None
+        if "resolution" in self.config or self.config.get("capture"):
+            # fixed internal resolution, change it at runtime with get_render_target().resize()
+            resolution = self.config.get('resolution', (r.get_screen_width(), r.get_screen_height()))
+            # capture reads back the previous frame's buffer, the readback itself is still synchronous
+            set_render_target(RenderTarget(*resolution, buffers=2 if self.config.get("capture") else 1))
+            if self.config.get("capture"):
+                from .capture import FrameCapture, PipeSink, SharedMemoryRing, ffmpeg_command
+                width, height = map(int, resolution)
+                if self.config['capture'].startswith("shm:"):
+                    sink = SharedMemoryRing(width, height, name=self.config['capture'][4:] or None)
+                else:
+                    sink = PipeSink(width, height, ffmpeg_command(width, height, self.config.get('fps', 60), self.config['capture']))
+                capture = FrameCapture(sink)
+        profiler = None
+        if self.config.get("profile"):
+            from .profiler import Profiler
+            profiler = Profiler(output=self.config['profile'] if isinstance(self.config['profile'], str) else None)
+        governor = None
+        if self.config.get("quality"):
+            from .quality import QualityGovernor
+            governor = QualityGovernor(fps=self.config.get('fps', 60),
+                                       output=self.config['quality'] if isinstance(self.config['quality'], str) else None)
+        telemetry = None
+        if self.config.get("telemetry"):
+            from .telemetry import FrameTelemetry
+            telemetry = FrameTelemetry(output=self.config['telemetry'] if isinstance(self.config['telemetry'], str) else None,
+                                       interval=self.config.get('telemetry_interval'))
         self.enter()
-        while not r.window_should_close():
+        if profiler:
+            profiler.enable()
+        frames = 0
+        while not r.window_should_close() and frames != self.config.get('frames'):
+            frames += 1
+            if profiler:
+                profiler.begin_frame()
+            scene = self._scene.__class__.__name__ if self._scene is not None else None
+            state = getattr(self._scene, "state", None)
+            t0 = perf_counter()
+            poll_input()
             dt = r.get_frame_time()
             self.step(dt)
+            t1 = perf_counter()
             r.begin_drawing()
             self.draw()
+            if profiler:
+                profiler.draw_overlay()
+            t2 = perf_counter()
             r.end_drawing()
+            if telemetry:
+                telemetry.record(scene, state, t1 - t0, t2 - t1, perf_counter() - t2)
+            if capture:
+                capture.capture()
+            if governor:
+                # present is left out, it includes the wait for the fps limit
+                governor.record(t2 - t0)
+            if profiler:
+                profiler.end_frame()
+        if profiler:
+            profiler.disable()
+        if telemetry:
+            telemetry.dump()
+        if capture:
+            capture.close()
+            print(json.dumps({"capture": capture.report()}))
         await self.quit()
 
     async def on_ready(self, data: EventData):
@@ -141,39 +204,56 @@ class BotBot(Scene):
         pass
 
     async def on_bet(self, data: ChatCommand):
-        pass
+        # balances aren't tracked yet, bets only feed the current scene's pool
+        place_bet = getattr(self._scene, "place_bet", None)
+        if place_bet is None:
+            await data.reply("There is nothing to bet on right now")
+            return
+        try:
+            number, amount = (int(x) for x in data.parameter.split())
+        except ValueError:
+            await data.reply("Usage: !bet <horse number> <amount>")
+            return
+        try:
+            place_bet(number, amount)
+        except (ValueError, PoolClosedError) as e:
+            await data.reply(str(e))
 
     def enter(self):
         self.next()
 
     def setup_next(self):
         if self._scene is not None:
-            unload_cache()
             self._last_scene = self._scene.__class__.__name__
         available_states = [s for s in self.states[:-1] if s != self._last_scene]
         next_state = random.choice(available_states)
-        if self._scene is not None:
-            self._scene.exit()
-        for module in sys.modules.values():
-            if hasattr(module, next_state):
-                SceneClass = getattr(module, next_state)
-                break
+        # scenes are kept warm once built, switching back resumes them through `reenter`
+        scene = self._warm_scenes.get(next_state)
+        if scene is None:
+            SceneClass = find_scene(next_state)
+            scene = SceneClass()
+            scene.clear_color = getattr(SceneClass, 'background_color', r.RAYWHITE)
+            self._warm_scenes[next_state] = scene
+        if self._scene is None:
+            Scene.push_scene(scene)
         else:
-            raise ValueError(f"Scene `{next_state}` not found")
-        self._scene = SceneClass()
-        self._scene.clear_color = getattr(SceneClass, 'background_color', r.RAYWHITE)
-        self._scene.enter()
+            Scene.replace_scene(scene)
+        Scene.update_scenes()
+        self._scene = scene
         self.fsm.set_state(next_state)
 
     def step(self, delta):
-        if self._scene is not None:
-            self._scene.step(delta)
-        if r.is_key_pressed(r.KEY_SPACE):
+        Scene.update_scenes()
+        Scene.step_scenes(delta)
+        stack = Scene.scene_stack()
+        for scene in self._warm_scenes.values():
+            if scene not in stack:
+                scene.step_background(delta)
+        if Keyboard.key_pressed("space"):
             self.next()
 
     def draw(self):
-        if self._scene is not None:
-            self._scene.draw()
+        Scene.draw_scenes()
 
 class DefaultBot(BotBot):
     config = {
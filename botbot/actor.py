@@ -21,13 +21,16 @@ from typing import Optional, override, Callable, Type, Any
 import raylib as rl
 import pyray as r
 from .easing import ease_linear_in_out
+from .render import Command, submit, unload_after_flush
+from .audio import voice_pool, stream_music, unstream_music, play_music, stop_music, pause_music, resume_music, seek_music
 from contextlib import contextmanager
-from queue import Queue
 from uuid import uuid4
+from math import cos, sin, radians
+import weakref
 
 __all__ = ["LineNode", "RectangleNode", "CircleNode", "TriangleNode", "EllipseNode", "SpriteNode",
            "LabelNode", "MusicNode", "SoundNode", "TimerNode", "ActionNode", "ActionSequence",
-           "WaitAction", "EmitterNode", "Actor"]
+           "WaitAction", "EmitterNode", "Actor", "clear_text_runs"]
 
 class ActorType:
     pass
@@ -77,9 +80,20 @@ class ActorParent:
     def remove_all_children(self):
         self._children = []
 
+def _union(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    x, y = min(a[0], b[0]), min(a[1], b[1])
+    return x, y, max(a[0] + a[2], b[0] + b[2]) - x, max(a[1] + a[3], b[1] + b[3]) - y
+
 @dataclass
 class Actor(ActorType, ActorParent):
     name: str = field(default_factory=lambda: uuid4().hex)
+    static: bool = False
+    # draw layer, added to the layers of any plain Actor containers above it
+    z: float = 0.
 
     def __str__(self):
         return f"(Node({self.__class__.__name__}) {" ".join([f"{key}:{getattr(self, key)}" for key in list(vars(self).keys())])})"
@@ -103,6 +117,24 @@ class Actor(ActorType, ActorParent):
         for child in reversed(self.all_children()):
             child.draw()
 
+    def _own_bounds(self):
+        return None
+
+    def _sort_y(self):
+        return 0.
+
+    def _texture_id(self):
+        return 0
+
+    def bounds(self):
+        """
+        World space (x, y, width, height) covering this actor and its children, None if it draws nothing
+        """
+        bounds = self._own_bounds()
+        for child in self.all_children():
+            bounds = _union(bounds, child.bounds())
+        return bounds
+
 @dataclass
 class BaseTimer(Actor):
     duration: float = 1.
@@ -268,6 +300,9 @@ class ActionNode(ActionType, TimerNode):
                     setattr(obj, self.field[i], v)
             else:
                 obj = getattr(obj, self.field[i])
+        if len(self.field) > 1 and self.field[0] in getattr(self.actor, "_transform_fields", ()):
+            # writing through a sub-object like `position.x` bypasses __setattr__ on the actor
+            self.actor.mark_dirty()
 
 class WaitAction(ActionType, TimerNode):
     def __init__(self, **kwargs):
@@ -285,12 +320,11 @@ class WaitAction(ActionType, TimerNode):
             self._on_complete_usr()
         self.remove_me()
 
-class ActionSequence(ActionType, TimerNode, Queue):
+class ActionSequence(ActionType, TimerNode):
     def __init__(self, actions: list[ActionType], duration: float = 0., auto_start: bool = True, remove_on_complete: bool = True, repeat: bool = False):
-        Queue.__init__(self)
+        # actions are only ever touched from the game loop, a plain index replaces the old locked queue
         self._actions = actions
-        for action in actions:
-            self.put(action)
+        self._index = 0
         TimerNode.__init__(self,
                            duration=duration,
                            auto_start=auto_start,
@@ -312,6 +346,9 @@ class ActionSequence(ActionType, TimerNode, Queue):
             if self.remove_on_complete:
                 self.remove_me()
 
+    def empty(self):
+        return self._index >= len(self._actions)
+
     @override
     def step(self, delta: float):
         if not self._running or (self.empty() and not self._head):
@@ -324,16 +361,15 @@ class ActionSequence(ActionType, TimerNode, Queue):
                 else:
                     self._head = None
         else:
-            self._head = self.get()
+            self._head = self._actions[self._index]
+            self._index += 1
             self._head.start()
 
     @override
     def reset(self):
         self._completed = False
         self._head = None
-        self.queue.clear()
-        for action in self._actions:
-            self.put(action)
+        self._index = 0
 
     @override
     def start(self):
@@ -381,29 +417,77 @@ class Actor2D(Actor):
     scale: float = 1.
     origin: Vector2 = field(default_factory=lambda: Vector2([0.5, 0.5]))
     color: r.Color = r.WHITE
+    # order by screen y within the layer so lower actors are drawn over higher ones
+    y_sort: bool = False
+
+    # assigning any of these invalidates the cached transform of this actor and its descendants
+    _transform_fields = frozenset(["position", "rotation", "scale", "origin", "parent"])
+    _transform_version = 0
+    _world_version = -1
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self._transform_fields:
+            self.mark_dirty()
+
+    def mark_dirty(self):
+        """
+        Invalidate cached transforms, call after mutating position, source or dst in place
+        """
+        self.__dict__["_transform_version"] = self._transform_version + 1
+        for child in self.all_children():
+            if isinstance(child, Actor2D):
+                child.mark_dirty()
+
+    def world_transform(self) -> tuple[Vector2, float]:
+        """
+        Position and rotation composed with every Actor2D ancestor, cached until something changes
+        """
+        if self._world_version != self._transform_version:
+            parent = self.__dict__.get("parent")
+            if isinstance(parent, Actor2D):
+                position, rotation = parent.world_transform()
+                if rotation:
+                    c, s = cos(radians(rotation)), sin(radians(rotation))
+                    position = position + Vector2([self.position.x * c - self.position.y * s,
+                                                   self.position.x * s + self.position.y * c])
+                else:
+                    position = position + self.position
+                rotation += self.rotation
+            else:
+                position, rotation = self.position, self.rotation
+            self.__dict__["_world"] = position, rotation
+            self.__dict__["_world_version"] = self._transform_version
+        return self._world
 
     def _offset(self):
-        return self.position + self.origin * Vector2([-self.width, -self.height])
-    
+        return self.world_transform()[0] + self.origin * Vector2([-self.width, -self.height])
+
+    def _sort_y(self):
+        return self.world_transform()[0].y
+
+    def _own_bounds(self):
+        if not hasattr(self, "width") or not hasattr(self, "height"):
+            return None
+        x, y = self._offset()
+        return x, y, self.width, self.height
+
 class BaseShape(Actor2D):
-    draw_func = None
-    draw_wire_func = None
+    draw_command = None
+    draw_wire_command = None
 
 @dataclass
 class ShapeActor(BaseShape):
     wireframe: bool = False
     line_thickness: float = 1.
 
-    def _draw(self, *args, **kwargs):
-        if self.wireframe:
-            self.__class__.draw_wire_func(*args, **kwargs)
-        else:
-            self.__class__.draw_func(*args, **kwargs)
+    def _draw(self, *args):
+        submit(self.draw_wire_command if self.wireframe else self.draw_command, *args)
 
 @dataclass
 class LineNode(ShapeActor):
-    draw_func = rl.DrawLineEx
-    draw_wire_func = rl.DrawLineEx
+    draw_command = Command.LINE
+    draw_wire_command = Command.LINE
     end: Vector2 = field(default_factory=Vector2)
     thickness: float = 1.
 
@@ -412,16 +496,27 @@ class LineNode(ShapeActor):
         self._draw([*self.position], [*self.end], self.thickness, self.color)
         super().draw()
 
+    def _own_bounds(self):
+        x, y = min(self.position.x, self.end.x), min(self.position.y, self.end.y)
+        return (x - self.thickness, y - self.thickness,
+                abs(self.end.x - self.position.x) + self.thickness * 2,
+                abs(self.end.y - self.position.y) + self.thickness * 2)
+
 @dataclass
 class RectangleNode(ShapeActor):
-    draw_func = rl.DrawRectangleRec
-    draw_wire_func = rl.DrawRectangleLinesEx
+    draw_command = Command.RECTANGLE
+    draw_wire_command = Command.RECTANGLE_LINES
     width: float = 1.
     height: float = 1.
+    _transform_fields = Actor2D._transform_fields | {"width", "height"}
+    _rec_version = -1
 
     @override
     def draw(self):
-        rec = r.Rectangle(*self._offset(), self.width, self.height)
+        if self._rec_version != self._transform_version:
+            self._rec = r.Rectangle(*self._offset(), self.width, self.height)
+            self._rec_version = self._transform_version
+        rec = self._rec
         if self.wireframe:
             self._draw(rec, self.line_thickness, self.color)
         else:
@@ -430,8 +525,8 @@ class RectangleNode(ShapeActor):
 
 @dataclass
 class CircleNode(ShapeActor):
-    draw_func = rl.DrawCircle
-    draw_wire_func = rl.DrawCircleLines
+    draw_command = Command.CIRCLE
+    draw_wire_command = Command.CIRCLE_LINES
     radius: float = 1.
 
     @override
@@ -439,10 +534,13 @@ class CircleNode(ShapeActor):
         self._draw(int(self.position.x), int(self.position.y), self.radius, self.color)
         super().draw()
 
+    def _own_bounds(self):
+        return self.position.x - self.radius, self.position.y - self.radius, self.radius * 2, self.radius * 2
+
 @dataclass
 class TriangleNode(ShapeActor):
-    draw_func = rl.DrawTriangle
-    draw_wire_func = rl.DrawTriangleLines
+    draw_command = Command.TRIANGLE
+    draw_wire_command = Command.TRIANGLE_LINES
     position2: Vector2 = field(default_factory=Vector2)
     position3: Vector2 = field(default_factory=Vector2)
 
@@ -457,10 +555,15 @@ class TriangleNode(ShapeActor):
         self._draw([*stri[0]], [*stri[1]], [*stri[2]], self.color)
         super().draw()
 
+    def _own_bounds(self):
+        xs = self.position.x, self.position2.x, self.position3.x
+        ys = self.position.y, self.position2.y, self.position3.y
+        return min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+
 @dataclass
 class EllipseNode(ShapeActor):
-    draw_func = rl.DrawEllipse
-    draw_wire_func = rl.DrawEllipseLines
+    draw_command = Command.ELLIPSE
+    draw_wire_command = Command.ELLIPSE_LINES
     width: float = 1.
     height: float = 1.
 
@@ -469,6 +572,9 @@ class EllipseNode(ShapeActor):
         self._draw(self.position.x, self.position.y, self.width, self.height, self.color)
         super().draw()
 
+    def _own_bounds(self):
+        return self.position.x - self.width, self.position.y - self.height, self.width * 2, self.height * 2
+
 @dataclass
 class SpriteNode(ShapeActor):
     texture: r.Texture = None
@@ -476,6 +582,9 @@ class SpriteNode(ShapeActor):
     dst: r.Rectangle = r.Rectangle(0, 0, 0, 0)
     scale: Vector2 = field(default_factory=lambda: Vector2([1., 1.]))
 
+    _transform_fields = Actor2D._transform_fields | {"texture", "source", "dst"}
+    _params_version = -1
+
     @property
     def width(self):
         return self.texture.width
@@ -484,19 +593,100 @@ class SpriteNode(ShapeActor):
     def height(self):
         return self.texture.height
 
-    @override
-    def draw(self):
-        if self.texture:
+    def _draw_params(self):
+        """
+        Source, dest, origin and rotation for DrawTexturePro, rebuilt only when the transform changed
+        """
+        if self._params_version != self._transform_version:
             if self.source.width == 0 or self.source.height == 0:
                 self.source = r.Rectangle(0, 0, self.texture.width, self.texture.height)
             if self.dst.width == 0 or self.dst.height == 0:
-                self.dst = r.Rectangle(self.position.x, self.position.y, self.width, self.height)
-            r.draw_texture_pro(self.texture,
-                            [self.source.x, self.source.y, self.source.width, self.source.height],
-                            [self.dst.x, self.dst.y, self.dst.width * self.scale.x, self.dst.height * self.scale.y],
-                            [*(-self._offset() * self.scale)], self.rotation, self.color)
+                position = self.world_transform()[0]
+                self.dst = r.Rectangle(position.x, position.y, self.width, self.height)
+            origin = -self._offset() * self.scale
+            self._params = (r.Rectangle(self.source.x, self.source.y, self.source.width, self.source.height),
+                            r.Rectangle(self.dst.x, self.dst.y, self.dst.width * self.scale.x, self.dst.height * self.scale.y),
+                            r.Vector2(origin.x, origin.y),
+                            self.world_transform()[1])
+            self._params_version = self._transform_version
+        return self._params
+
+    def _sort_y(self):
+        return self._draw_params()[1].y if self.texture else super()._sort_y()
+
+    def _texture_id(self):
+        return self.texture.id if self.texture else 0
+
+    @override
+    def draw(self):
+        if self.texture:
+            source, dest, origin, rotation = self._draw_params()
+            submit(Command.TEXTURE, self.texture, source, dest, origin, rotation, self.color)
         super().draw()
 
+    def _own_bounds(self):
+        if not self.texture:
+            return None
+        w = (self.dst.width or self.width) * self.scale.x
+        h = (self.dst.height or self.height) * self.scale.y
+        ox, oy = self._offset() * self.scale
+        position = self.world_transform()[0]
+        x, y = (self.dst.x if self.dst.width else position.x) + ox, (self.dst.y if self.dst.height else position.y) + oy
+        if self.rotation:
+            # rotation pivots around the origin, so cover every angle it could reach
+            reach = max(abs(ox), abs(ox + w)) ** 2 + max(abs(oy), abs(oy + h)) ** 2
+            reach = reach ** .5
+            return x - ox - reach, y - oy - reach, reach * 2, reach * 2
+        return x, y, w, h
+
+@dataclass
+class TextRun:
+    text: Any
+    width: float
+    height: float
+    texture: Optional[r.Texture] = None
+    # baked labels currently drawing `texture`, it is unloaded when the last one lets go
+    users: int = 0
+
+__text_runs = {}
+_TEXT_RUN_LIMIT = 4096
+
+def text_run(font: r.Font, text: str, font_size: float, spacing: float) -> TextRun:
+    """
+    Shared measurement cache for a string in a given font, also holds the encoded text ready to hand to raylib
+    A baked texture on a run is freed once no label draws it, the entries themselves are dropped at the limit
+    """
+    key = (font.texture.id, font.baseSize, font.glyphCount, text, font_size, spacing)
+    run = __text_runs.get(key)
+    if run is None:
+        if len(__text_runs) >= _TEXT_RUN_LIMIT:
+            # this can happen part way through a draw, so baked textures are only unloaded after the flush
+            for stale in __text_runs.values():
+                if stale.texture is not None:
+                    unload_after_flush(stale.texture)
+                    stale.texture = None
+            __text_runs.clear()
+        size = r.measure_text_ex(font, text, font_size, spacing)
+        run = TextRun(rl.ffi.new("char[]", text.encode("utf-8")), size.x, size.y)
+        __text_runs[key] = run
+    return run
+
+def _release_run(run: TextRun):
+    run.users -= 1
+    if run.users <= 0 and run.texture is not None:
+        # the texture may already be queued for drawing this frame
+        unload_after_flush(run.texture)
+        run.texture = None
+
+def clear_text_runs():
+    """
+    Drop every cached text run and unload any baked label textures, only safe outside a frame
+    """
+    for run in __text_runs.values():
+        if run.texture is not None:
+            r.unload_texture(run.texture)
+    __text_runs.clear()
+
 @dataclass
 class LabelNode(ShapeActor):
     text: str = ""
@@ -504,33 +694,63 @@ class LabelNode(ShapeActor):
     font_size: float = 16.
     spacing: float = 2.
     color: r.Color = r.RAYWHITE
-
-    def _size(self):
-        size = r.measure_text_ex(self.font, self.text, self.font_size, self.spacing)
-        if not hasattr(self, '_width'):
-            self._width = size.x
-        if not hasattr(self, '_height'):
-            self._height = size.y
-        return size
+    baked: bool = False
+    # set by the quality governor to bake every label regardless of `baked`
+    bake_all = False
+    _transform_fields = Actor2D._transform_fields | {"text", "font", "font_size", "spacing"}
+    _origin_version = -1
+    # the run whose baked texture this label is drawing, released on text change, unbaking or collection
+    _held = None
+    _release = None
+
+    def _hold(self, run: Optional[TextRun]):
+        if self._release is not None:
+            self._release()
+            self._release = None
+        self._held = run
+        if run is not None:
+            run.users += 1
+            self._release = weakref.finalize(self, _release_run, run)
+
+    def _run(self):
+        if not self.font:
+            self.font = r.get_font_default()
+        return text_run(self.font, self.text, self.font_size, self.spacing)
 
     @property
     def width(self):
-        if not hasattr(self, '_width'):
-            return self._size().x
-        else:
-            return self._width
+        return self._run().width
 
     @property
     def height(self):
-        if not hasattr(self, '_height'):
-            return self._size().y
-        else:
-            return self._height
+        return self._run().height
+
+    def _texture_id(self):
+        run = self._run()
+        return run.texture.id if (self.baked or LabelNode.bake_all) and run.texture is not None else self.font.texture.id
+
+    def _bake(self, run: TextRun):
+        image = r.image_text_ex(self.font, self.text, self.font_size, self.spacing, r.WHITE)
+        run.texture = r.load_texture_from_image(image)
+        r.unload_image(image)
 
     def draw(self):
-        if not self.font:
-            self.font = r.get_font_default()
-        r.draw_text_pro(self.font, self.text, [0,0], [*-self._offset()], self.rotation, self.font_size, self.spacing, self.color)
+        run = self._run()
+        if self._origin_version != self._transform_version:
+            origin = -self._offset()
+            self._origin = r.Vector2(origin.x, origin.y)
+            self._origin_version = self._transform_version
+        if self.baked or LabelNode.bake_all:
+            if self._held is not run:
+                self._hold(run)
+            if run.texture is None:
+                self._bake(run)
+            w, h = run.texture.width, run.texture.height
+            submit(Command.TEXTURE, run.texture, (0, 0, w, h), (0, 0, w, h), self._origin, self.world_transform()[1], self.color)
+        else:
+            if self._held is not None:
+                self._hold(None)
+            submit(Command.TEXT, self.font, run.text, (0, 0), self._origin, self.world_transform()[1], self.font_size, self.spacing, self.color)
         super().draw()
 
 class AudioActor(Actor):
@@ -595,6 +815,8 @@ class AudioActor(Actor):
 @dataclass
 class SoundNode(AudioActor):
     sound: r.Sound = None
+    # more than one voice lets plays overlap, the voices are aliases shared by every node using this sound
+    voices: int = 1
     play_func = r.play_sound
     stop_func = r.stop_sound
     pause_func = r.pause_sound
@@ -608,15 +830,72 @@ class SoundNode(AudioActor):
     def audio(self):
         return self.sound
 
+    @property
+    def _pool(self):
+        return voice_pool(self.sound, self.voices) if self.sound and self.voices > 1 else None
+
+    def play(self):
+        if pool := self._pool:
+            pool.play()
+        else:
+            super().play()
+
+    def stop(self):
+        if pool := self._pool:
+            pool.each(r.stop_sound)
+        else:
+            super().stop()
+
+    def pause(self):
+        if pool := self._pool:
+            pool.each(r.pause_sound)
+        else:
+            super().pause()
+
+    def resume(self):
+        if pool := self._pool:
+            pool.each(r.resume_sound)
+        else:
+            super().resume()
+
+    def set_volume(self, volume: float):
+        if pool := self._pool:
+            pool.each(r.set_sound_volume, max(0., min(volume, 1.)))
+        else:
+            super().set_volume(volume)
+
+    def set_pitch(self, pitch: float):
+        if pool := self._pool:
+            pool.each(r.set_sound_pitch, max(0., min(pitch, 1.)))
+        else:
+            super().set_pitch(pitch)
+
+    def set_pan(self, pan: float):
+        if pool := self._pool:
+            pool.each(r.set_sound_pan, max(0., min(pan, 1.)))
+        else:
+            super().set_pan(pan)
+
+    @property
+    def playing(self):
+        if pool := self._pool:
+            return pool.playing
+        return AudioActor.playing.fget(self)
+
+    @playing.setter
+    def playing(self, value: bool):
+        AudioActor.playing.fset(self, value)
+
 @dataclass
 class MusicNode(AudioActor):
     music: r.Music = None
     loop: bool = False
     auto_start: bool = False
-    play_func = r.play_music_stream
-    stop_func = r.stop_music_stream
-    pause_func = r.pause_music_stream
-    resume_func = r.resume_music_stream
+    # locked against the audio thread, which may be refilling the same stream
+    play_func = play_music
+    stop_func = stop_music
+    pause_func = pause_music
+    resume_func = resume_music
     set_volume_func = r.set_music_volume
     set_pitch_func = r.set_music_pitch
     set_pan_func = r.set_music_pan
@@ -636,8 +915,20 @@ class MusicNode(AudioActor):
         if self.auto_start:
             self.play()
 
+    def play(self):
+        if self.music:
+            # raylib loops on its own, the buffers are refilled from the audio thread rather than each step
+            self.music.looping = self.loop
+            super().play()
+            stream_music(self.music)
+
+    def stop(self):
+        if self.music:
+            unstream_music(self.music)
+        super().stop()
+
     def seek(self, position: float):
-        r.seek_music_stream(self.audio, position)
+        seek_music(self.audio, position)
 
     @property
     def length(self):
@@ -649,7 +940,7 @@ class MusicNode(AudioActor):
 
     @position.setter
     def position(self, value: float):
-        r.seek_music_stream(self.audio, value)
+        seek_music(self.audio, value)
 
     def toggle(self):
         if self.playing:
@@ -657,10 +948,3 @@ class MusicNode(AudioActor):
         else:
             self.play()
 
-    def step(self, delta: float):
-        if self.playing:
-            r.update_music_stream(self.audio)
-            if not self.playing and self.loop:
-                self.position = 0
-                self.play()
-        super().step(delta)
@@ -0,0 +1,155 @@
+# spritekit/animation.py
+#
+# Copyright (C) 2025 George Watson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pyray as r
+from heapq import heappush, heappop
+from enum import Enum
+from typing import Optional
+import weakref
+
+__all__ = ["SpriteSheet", "Animator", "animator"]
+
+class SpriteSheet:
+    """
+    Frame tables for a sheet laid out with one block of rows per animation and one row per orientation
+    """
+    def __init__(self,
+                 frame_width: int,
+                 frame_height: int,
+                 animations: list[tuple[str, int, float]],
+                 orientations: int = 1,
+                 row_offset: int = 0):
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        # (name, orientation) -> (row y, frame count, seconds per frame)
+        self._table = {(name, orientation): ((i * orientations + orientation + row_offset) * frame_height, frames, period)
+                       for i, (name, frames, period) in enumerate(animations)
+                       for orientation in range(orientations)}
+
+    def clip(self, name: str, orientation: int | Enum = 0) -> tuple[int, int, float]:
+        try:
+            return self._table[name, orientation.value if isinstance(orientation, Enum) else orientation]
+        except KeyError:
+            raise ValueError(f"Animation `{name}` not found") from None
+
+class Animator:
+    """
+    Advances sprite sheet animations from one shared clock
+
+    Per-sprite state lives in parallel arrays indexed by slot, and the next frame change of every
+    playing sprite is kept in a heap, so a step only touches sprites whose frame actually changes
+    """
+    def __init__(self):
+        self.time = 0.
+        self._heap = []
+        self._slots = {}
+        self._free = []
+        self._sprite = []
+        self._sheet = []
+        self._row = []
+        self._frames = []
+        self._period = []
+        self._frame = []
+        self._due = []
+        self._remaining = []
+        self._generation = []
+
+    def _allocate(self, sprite):
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._sprite)
+            for column in (self._sprite, self._sheet, self._row, self._frames, self._period,
+                           self._frame, self._due, self._remaining):
+                column.append(None)
+            self._generation.append(0)
+        key = id(sprite)
+        # slots are released when the sprite is collected, nothing needs to unregister it
+        self._sprite[slot] = weakref.ref(sprite, lambda _: self._release(key))
+        self._slots[key] = slot
+        return slot
+
+    def _release(self, key):
+        slot = self._slots.pop(key, None)
+        if slot is not None:
+            self._generation[slot] += 1
+            self._sprite[slot] = self._sheet[slot] = None
+            self._free.append(slot)
+
+    def _schedule(self, slot, due):
+        self._generation[slot] += 1
+        self._due[slot] = due
+        heappush(self._heap, (due, self._generation[slot], slot))
+
+    def _show(self, slot, sprite):
+        sheet = self._sheet[slot]
+        sprite.source = r.Rectangle(self._frame[slot] * sheet.frame_width, self._row[slot],
+                                    sheet.frame_width, sheet.frame_height)
+
+    def play(self, sprite, sheet: SpriteSheet, name: str, orientation: int | Enum = 0, speed: float = 1.):
+        """
+        Start `name` from its first frame, replacing whatever the sprite was playing
+        """
+        row, frames, period = sheet.clip(name, orientation)
+        slot = self._slots.get(id(sprite))
+        if slot is None:
+            slot = self._allocate(sprite)
+        self._sheet[slot] = sheet
+        self._row[slot] = row
+        self._frames[slot] = frames
+        self._period[slot] = period / speed
+        self._frame[slot] = 0
+        self._schedule(slot, self.time + self._period[slot])
+        self._show(slot, sprite)
+
+    def stop(self, sprite):
+        self._release(id(sprite))
+
+    def pause(self, sprite):
+        slot = self._slots.get(id(sprite))
+        if slot is not None and self._due[slot] is not None:
+            self._remaining[slot] = self._due[slot] - self.time
+            self._due[slot] = None
+            # invalidates the pending heap entry
+            self._generation[slot] += 1
+
+    def resume(self, sprite):
+        slot = self._slots.get(id(sprite))
+        if slot is not None and self._due[slot] is None:
+            self._schedule(slot, self.time + self._remaining[slot])
+
+    def frame(self, sprite) -> Optional[int]:
+        slot = self._slots.get(id(sprite))
+        return None if slot is None else self._frame[slot]
+
+    def step(self, delta: float):
+        self.time += delta
+        heap = self._heap
+        while heap and heap[0][0] <= self.time:
+            due, generation, slot = heappop(heap)
+            if generation != self._generation[slot]:
+                continue
+            period = self._period[slot]
+            # a long frame can skip several animation frames at once
+            steps = int((self.time - due) // period) + 1
+            self._frame[slot] = (self._frame[slot] + steps) % self._frames[slot]
+            self._schedule(slot, due + steps * period)
+            sprite = self._sprite[slot]()
+            if sprite is not None:
+                self._show(slot, sprite)
+
+animator = Animator()
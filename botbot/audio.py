@@ -0,0 +1,149 @@
+# spritekit/audio.py
+#
+# Copyright (C) 2025 George Watson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import raylib as rl
+import threading
+
+__all__ = ["VoicePool", "voice_pool", "release_voices", "stream_music", "unstream_music", "stop_audio_thread",
+           "play_music", "stop_music", "pause_music", "resume_music", "seek_music"]
+
+# how often the audio thread refills music buffers, well inside raylib's default buffer length
+_STREAM_INTERVAL = .005
+
+_streams = ()
+_lock = threading.Lock()
+_stop = threading.Event()
+_thread = None
+
+def _feed():
+    while not _stop.wait(_STREAM_INTERVAL):
+        # held for the whole sweep so a stream can't be unloaded while it is being refilled
+        with _lock:
+            for music in _streams:
+                rl.UpdateMusicStream(music)
+
+def stream_music(music):
+    """
+    Keep `music` fed from the audio thread, independent of how long frames take
+    """
+    global _streams, _thread
+    with _lock:
+        if not any(m is music for m in _streams):
+            _streams = _streams + (music,)
+    if _thread is None:
+        _stop.clear()
+        _thread = threading.Thread(target=_feed, name="botbot-audio", daemon=True)
+        _thread.start()
+
+def unstream_music(music):
+    global _streams
+    with _lock:
+        _streams = tuple(m for m in _streams if m is not music)
+
+# the decoder behind a stream is not thread safe, anything that can touch it from the main
+# thread takes the same lock the audio thread holds while refilling
+
+def play_music(music):
+    with _lock:
+        rl.PlayMusicStream(music)
+
+def stop_music(music):
+    with _lock:
+        rl.StopMusicStream(music)
+
+def pause_music(music):
+    with _lock:
+        rl.PauseMusicStream(music)
+
+def resume_music(music):
+    with _lock:
+        rl.ResumeMusicStream(music)
+
+def seek_music(music, position: float):
+    with _lock:
+        rl.SeekMusicStream(music, position)
+
+def stop_audio_thread():
+    global _thread, _streams
+    if _thread is not None:
+        _stop.set()
+        _thread.join()
+        _thread = None
+    _streams = ()
+
+class VoicePool:
+    """
+    Aliases of one loaded sound that share its wave data, so overlapping plays don't cut each other off
+    """
+    def __init__(self, sound, voices: int = 4):
+        self.sound = sound
+        self.voices = [sound]
+        self._next = 0
+        self.grow(voices)
+
+    def grow(self, voices: int):
+        while len(self.voices) < voices:
+            self.voices.append(rl.LoadSoundAlias(self.sound))
+
+    def play(self):
+        """
+        Play on an idle voice, stealing the one that started longest ago when they are all busy
+        """
+        count = len(self.voices)
+        index = self._next
+        for i in range(count):
+            if not rl.IsSoundPlaying(self.voices[(self._next + i) % count]):
+                index = (self._next + i) % count
+                break
+        self._next = (index + 1) % count
+        voice = self.voices[index]
+        rl.PlaySound(voice)
+        return voice
+
+    def each(self, func, *args):
+        for voice in self.voices:
+            func(voice, *args)
+
+    @property
+    def playing(self):
+        return any(rl.IsSoundPlaying(voice) for voice in self.voices)
+
+    def release(self):
+        for voice in self.voices[1:]:
+            rl.UnloadSoundAlias(voice)
+        self.voices = [self.sound]
+
+__pools = {}
+
+def voice_pool(sound, voices: int = 4) -> VoicePool:
+    """
+    Shared pool for a loaded sound, grown to at least `voices`
+    """
+    pool = __pools.get(id(sound))
+    if pool is None or pool.sound is not sound:
+        pool = __pools[id(sound)] = VoicePool(sound, voices)
+    else:
+        pool.grow(voices)
+    return pool
+
+def release_voices(sound):
+    """
+    Unload the aliases made for `sound`, must happen before the sound itself is unloaded
+    """
+    pool = __pools.pop(id(sound), None)
+    if pool is not None:
+        pool.release()
@@ -0,0 +1,187 @@
+# spritekit/capture.py
+#
+# Copyright (C) 2025 George Watson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import raylib as rl
+import numpy as np
+from .render import RenderTarget, get_render_target
+from .telemetry import Histogram
+from multiprocessing import shared_memory
+from time import perf_counter
+from typing import Optional
+import subprocess
+import threading
+import struct
+import queue
+
+__all__ = ["ffmpeg_command", "FrameSink", "PipeSink", "SharedMemoryRing", "FrameCapture"]
+
+def ffmpeg_command(width: int, height: int, fps: float, output: str, *encoder: str) -> list[str]:
+    """
+    ffmpeg arguments that read raw RGBA frames from stdin, `encoder` replaces the default x264 settings
+    """
+    return ["ffmpeg", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+            *(encoder or ("-c:v", "libx264", "-preset", "veryfast", "-tune", "zerolatency", "-pix_fmt", "yuv420p")),
+            output]
+
+class FrameSink:
+    """
+    Somewhere to put frames, `acquire` hands out the array the next frame is copied into and `commit` publishes it
+    """
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+
+    def acquire(self) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def commit(self, frame: np.ndarray):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class PipeSink(FrameSink):
+    """
+    Writes frames to the stdin of `command` from a writer thread, a slow reader drops frames instead of stalling the game
+    """
+    def __init__(self, width: int, height: int, command: list[str], buffers: int = 3):
+        super().__init__(width, height)
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self._free = queue.Queue()
+        self._full = queue.Queue()
+        for _ in range(buffers):
+            self._free.put(np.empty((height, width, 4), dtype=np.uint8))
+        self._thread = threading.Thread(target=self._write, name="botbot-capture", daemon=True)
+        self._thread.start()
+
+    def _write(self):
+        while (frame := self._full.get()) is not None:
+            try:
+                self._process.stdin.write(frame.data)
+            except (BrokenPipeError, ValueError):
+                return
+            self._free.put(frame)
+
+    def acquire(self):
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            return None
+
+    def commit(self, frame):
+        self._full.put(frame)
+
+    def close(self):
+        self._full.put(None)
+        self._thread.join()
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._process.wait()
+
+class SharedMemoryRing(FrameSink):
+    """
+    Frames in a named shared memory block that a local encoder maps directly
+
+    The block starts with a header of magic `BBFR`, then width, height and slot count as uint32 and
+    the number of frames written as uint64. Frame `n` (counting from 1) is in slot `(n - 1) % slots`,
+    each slot is `height` rows of `width` RGBA pixels top to bottom. The counter is bumped after a
+    slot is filled, readers that fall `slots - 1` frames behind should skip ahead
+    """
+    HEADER = struct.Struct("<4sIIIQ")
+
+    def __init__(self, width: int, height: int, name: Optional[str] = None, slots: int = 4):
+        super().__init__(width, height)
+        self.slots = slots
+        self._frame_size = width * height * 4
+        self._memory = shared_memory.SharedMemory(name=name, create=True, size=self.HEADER.size + self._frame_size * slots)
+        self.name = self._memory.name
+        self.written = 0
+        self.HEADER.pack_into(self._memory.buf, 0, b"BBFR", width, height, slots, 0)
+        self._ring = np.ndarray((slots, height, width, 4), dtype=np.uint8, buffer=self._memory.buf, offset=self.HEADER.size)
+
+    def acquire(self):
+        return self._ring[self.written % self.slots]
+
+    def commit(self, frame):
+        self.written += 1
+        struct.pack_into("<Q", self._memory.buf, self.HEADER.size - 8, self.written)
+
+    def close(self):
+        # the array views must go before the mapping can be closed
+        del self._ring
+        self._memory.close()
+        self._memory.unlink()
+
+class FrameCapture:
+    """
+    Reads frames back from the render target into a sink, timing readback and copy per frame
+
+    Readback is LoadImageFromTexture, a synchronous read that blocks the main thread until the
+    pixels are copied, raylib has no pixel buffer objects to make it asynchronous. Reading the
+    target's oldest buffer gives the GPU a frame's head start on it, but the copy itself still
+    costs frame time and is reported as `readback`. Frames are resized to the sink's size if the
+    target's resolution changes, e.g. when the quality governor lowers it
+    """
+    def __init__(self, sink: FrameSink, target: Optional[RenderTarget] = None):
+        self.sink = sink
+        self.target = target
+        self.captured = 0
+        self.dropped = 0
+        self.readback = Histogram()
+        self.copy = Histogram()
+        self.total = Histogram()
+
+    def capture(self):
+        """
+        Call once the frame has been flushed
+        """
+        target = self.target or get_render_target()
+        texture = target.completed() if target is not None else None
+        if texture is None:
+            return
+        t0 = perf_counter()
+        frame = self.sink.acquire()
+        if frame is None:
+            self.dropped += 1
+            return
+        image = rl.ffi.new("Image *", rl.LoadImageFromTexture(texture.texture))
+        t1 = perf_counter()
+        if (image.width, image.height) != (self.sink.width, self.sink.height):
+            rl.ImageResize(image, self.sink.width, self.sink.height)
+        pixels = np.frombuffer(rl.ffi.buffer(image.data, self.sink.width * self.sink.height * 4), dtype=np.uint8)
+        # render textures are stored bottom row first, flipped while copying into the sink's buffer
+        np.copyto(frame, pixels.reshape(self.sink.height, self.sink.width, 4)[::-1])
+        rl.UnloadImage(image[0])
+        self.sink.commit(frame)
+        t2 = perf_counter()
+        self.captured += 1
+        self.readback.add(t1 - t0)
+        self.copy.add(t2 - t1)
+        self.total.add(t2 - t0)
+
+    def report(self):
+        return {"captured": self.captured,
+                "dropped": self.dropped,
+                "readback": self.readback.summary(),
+                "copy": self.copy.summary(),
+                "total": self.total.summary()}
+
+    def close(self):
+        self.sink.close()
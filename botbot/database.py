@@ -0,0 +1,54 @@
+# spritekit/database.py
+#
+# Copyright (C) 2025 George Watson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from redis import Redis
+from pony.orm import *
+from . import AlreadyRegisteredError
+
+_DATABASE = Database()
+_CACHE = None
+_DEFAULT_BALANCE = 1000
+
+class Player(_DATABASE.Entity):
+    id = PrimaryKey(int, auto=True)
+    uid = Required(int, unique=True)
+    balance = Required(int, default=_DEFAULT_BALANCE)
+
+def _find_user(uid: int) -> Player:
+    with db_session:
+        return Player.get(uid=uid)
+
+def _create_user(uid: int) -> Player:
+    if _find_user(uid) is not None:
+        raise AlreadyRegisteredError()
+    with db_session:
+        return Player(uid=uid)
+
+def _user_stake(uid: int) -> int:
+    if (_CACHE.hexists("stakes", str(uid))):
+        return int(_CACHE.hget("stakes", str(uid)))
+    else:
+        return 0
+
+def _clear_stakes():
+    _CACHE.delete("stakes")
+
+def _connect_database():
+    global _DATABASE, _CACHE
+    _DATABASE.bind(provider="sqlite", filename="botbot.db", create_db=True)
+    _DATABASE.generate_mapping(create_tables=True)
+    _CACHE = Redis("localhost", 6379, 0)
@@ -1,4 +1,11 @@
-from .horses import HorseRaces
-from .roulette import Roulette
+from ..scene import lazy_scene, find_scene
 
-__all__ = ["HorseRaces", "Roulette"]
\ No newline at end of file
+lazy_scene("HorseRaces", __name__ + ".horses")
+lazy_scene("Roulette", __name__ + ".roulette")
+
+__all__ = ["HorseRaces", "Roulette"]
+
+def __getattr__(name):
+    if name in __all__:
+        return find_scene(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,11 @@
 from ..scene import *
-from ..raylib import Texture, TextureFromImage
+from ..raylib import Texture, TextureFromImage, Text
 from ..actor import *
 from ..easing import * 
+from ..animation import SpriteSheet
+from ..timeline import TimelineNode, Sequence, Parallel, Wait, Tween
+from ..quality import QualityLevel, quality_level, on_quality_change
+from ..pool import BettingPool, PoolClosedError
 from slimrr import Vector2
 import pyray as r
 from enum import Enum
@@ -11,6 +15,7 @@ import numpy as np
 import random
 from typing import Optional
 import copy
+from functools import lru_cache
 
 _HORSE_SIZE = (64, 48)
 _HORSE_ANIMATIONS = [
@@ -21,7 +26,9 @@ _HORSE_ANIMATIONS = [
     ("Rearing", 8, .5),
     ("Death", 6, .5)
 ]
+_HORSE_SHEET = SpriteSheet(*_HORSE_SIZE, _HORSE_ANIMATIONS, orientations=4, row_offset=1)
 _HORSE_COUNT = 8
+_LAYOUT_VARIANTS = 8
 
 class HorseOrientation(Enum):
     EAST = 0
@@ -40,71 +47,81 @@ def _screen_size() -> tuple[Vector2, Vector2]:
         screen = screen / 2
     return screen, screen / 2.
 
+def _show_first(parent, actors: list, shown: int, count: int) -> int:
+    """
+    Attach the first `count` of `actors` to `parent` given the first `shown` already are, returns `count`
+    """
+    for actor in actors[count:shown]:
+        parent.remove_child(actor)
+    for actor in actors[shown:count]:
+        parent.add_child(actor)
+    return count
+
 def _horse_animation(name: str, orientation: HorseOrientation = HorseOrientation.EAST) -> tuple[int, int, float]:
-    for i, (n, f, s) in enumerate(_HORSE_ANIMATIONS):
-        if n == name:
-            return i * (_HORSE_SIZE[1] * 4) + ((orientation.value + 1) * _HORSE_SIZE[1]), f, s
-    raise ValueError(f"Animation `{name}` not found")
+    return _HORSE_SHEET.clip(name, orientation)
 
-def _poisson_disc_sampling(width, height, r, k=30):
-    cell_size = r / sqrt(2)
+@lru_cache(maxsize=32)
+def _poisson_disc_layout(width: float, height: float, r: float, k: int, seed: Optional[int]) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    cell_size = r / np.sqrt(2)
     grid_width = int(width / cell_size) + 1
     grid_height = int(height / cell_size) + 1
-    grid = [None] * (grid_width * grid_height)
-    points = []
-    active = []
-    first_point = (random.uniform(0, width), random.uniform(0, height))
-    points.append(first_point)
-    active.append(first_point)
-    grid_x, grid_y = int(first_point[0] / cell_size), int(first_point[1] / cell_size)
-    grid[grid_y * grid_width + grid_x] = first_point
+    # grid is padded by two cells on every side so the 5x5 neighbourhood never goes out of bounds
+    grid = np.full((grid_height + 4, grid_width + 4, 2), np.inf)
+    window = np.arange(-2, 3)
+    points = np.empty((grid_width * grid_height, 2))
+    points[0] = rng.uniform((0, 0), (width, height))
+    grid[int(points[0, 1] / cell_size) + 2, int(points[0, 0] / cell_size) + 2] = points[0]
+    count = 1
+    active = [0]
     while active:
-        point_index = random.randint(0, len(active) - 1)
-        point = active[point_index]
-        found = False
-        for _ in range(k):
-            angle = random.uniform(0, 2 * np.pi)
-            distance = random.uniform(r, 2 * r)
-            new_point = (
-                point[0] + distance * np.cos(angle),
-                point[1] + distance * np.sin(angle))
-            if not (0 <= new_point[0] < width and 0 <= new_point[1] < height):
+        point_index = rng.integers(len(active))
+        point = points[active[point_index]]
+        angle = rng.uniform(0, 2 * np.pi, k)
+        distance = rng.uniform(r, 2 * r, k)
+        candidates = point + np.column_stack((distance * np.cos(angle), distance * np.sin(angle)))
+        candidates = candidates[(candidates[:, 0] >= 0) & (candidates[:, 0] < width) &
+                                (candidates[:, 1] >= 0) & (candidates[:, 1] < height)]
+        if len(candidates):
+            grid_x = (candidates[:, 0] / cell_size).astype(int) + 2
+            grid_y = (candidates[:, 1] / cell_size).astype(int) + 2
+            neighbors = grid[grid_y[:, None, None] + window[None, :, None],
+                             grid_x[:, None, None] + window[None, None, :]]
+            distances = ((neighbors - candidates[:, None, None, :]) ** 2).sum(axis=-1)
+            valid = np.flatnonzero((distances >= r * r).all(axis=(1, 2)))
+            if len(valid):
+                i = valid[0]
+                points[count] = candidates[i]
+                grid[grid_y[i], grid_x[i]] = candidates[i]
+                active.append(count)
+                count += 1
                 continue
-            grid_x, grid_y = int(new_point[0] / cell_size), int(new_point[1] / cell_size)
-            valid = True
-            for i in range(max(0, grid_x - 2), min(grid_width, grid_x + 3)):
-                for j in range(max(0, grid_y - 2), min(grid_height, grid_y + 3)):
-                    neighbor = grid[j * grid_width + i]
-                    if neighbor:
-                        distance = sqrt((new_point[0] - neighbor[0])**2 + (new_point[1] - neighbor[1])**2)
-                        if distance < r:
-                            valid = False
-                            break
-                if not valid:
-                    break
-            if valid:
-                points.append(new_point)
-                active.append(new_point)
-                grid[grid_y * grid_width + grid_x] = new_point
-                found = True
-                break
-        if not found:
-            active.pop(point_index)
+        active[point_index] = active[-1]
+        active.pop()
+    points = points[:count]
+    points.flags.writeable = False
     return points
 
+def _poisson_disc_sampling(width, height, r, k=30, seed: Optional[int] = None) -> np.ndarray:
+    args = float(width), float(height), float(r), int(k), seed
+    if seed is None:
+        return _poisson_disc_layout.__wrapped__(*args)
+    return _poisson_disc_layout(*args)
+
 class BaseHorseNode(SpriteNode):
     def _offset(self):
-        return self.position + self.origin - (Vector2(list(_HORSE_SIZE)) / 2.)
+        return self.world_transform()[0] + self.origin - (Vector2(list(_HORSE_SIZE)) / 2.)
 
 class HorseCustomization(BaseHorseNode):
     def __init__(self, texture: Texture, **kwargs):
         super().__init__(texture=texture, **kwargs)
-    
-    def step(self, _):
-        self.position = self.parent.position
-        self.origin = self.parent.origin
-        self.source = self.parent.source
-        self.dst = self.parent.dst
+
+    def _draw_params(self):
+        # customizations are layers drawn in the horse's frame
+        return self.parent._draw_params()
+
+    def _own_bounds(self):
+        return None
 
 class HorseNode(BaseHorseNode, FiniteStateMachine):
     states = ["Starting", "Idle", "Racing"]
@@ -115,20 +132,8 @@ class HorseNode(BaseHorseNode, FiniteStateMachine):
 
     def _set_animation(self, animation: str):
         self._animation = animation
-        y, f, s = _horse_animation(animation)
-        self._animation_y = y
         self._orientation = HorseOrientation.EAST
-        self._frame_max = f
-        self._frame_current = 0
-        self._base_animation_speed = s
-        self._animation_speed = s
-        self.remove_children(name="Animation")
-        self._timer = None
-        self._timer = TimerNode(name="Animation",
-                                duration=s,
-                                on_complete=self._on_complete,
-                                repeat=True)
-        self.add_child(self._timer)
+        self._animator.play(self, _HORSE_SHEET, animation, self._orientation)
 
     def __init__(self, breed: int, number: int, race_name: str, **kwargs):
         self._breed = breed
@@ -143,6 +148,8 @@ class HorseNode(BaseHorseNode, FiniteStateMachine):
                                dst=r.Rectangle(px, py, _HORSE_SIZE[0], _HORSE_SIZE[1]),
                                **kwargs)
         FiniteStateMachine.__init__(self)
+        # horses are made while their scene is on top, so they animate with it and freeze when it is suspended
+        self._animator = Scene.current_animator()
         self._set_animation("Walking")
         self._target = hscreen.x - _HORSE_SIZE[0]
         self._move_target_start = px + _HORSE_SIZE[0]
@@ -156,10 +163,17 @@ class HorseNode(BaseHorseNode, FiniteStateMachine):
         self._bursts_remaining = 6
         self._burst_chance = random.uniform(.2, .4)
         self._finished = False
+        self._customizations = []
         if random.random() < .5:
-            self.add_child(HorseCustomization(texture=Texture(f"assets/horses/customizations/markings/{random.randint(1, 8)}.png")))
+            self._customizations.append(HorseCustomization(texture=Texture(f"assets/horses/customizations/markings/{random.randint(1, 8)}.png")))
         if random.random() < .5:
-            self.add_child(HorseCustomization(texture=Texture(f"assets/horses/customizations/hair/{random.randint(1, 30)}.png")))
+            self._customizations.append(HorseCustomization(texture=Texture(f"assets/horses/customizations/hair/{random.randint(1, 30)}.png")))
+        self._customizations_shown = 0
+        self.show_customizations(True)
+
+    def show_customizations(self, show: bool):
+        self._customizations_shown = _show_first(self, self._customizations, self._customizations_shown,
+                                                 len(self._customizations) if show else 0)
 
     @property
     def horse_name(self):
@@ -169,20 +183,15 @@ class HorseNode(BaseHorseNode, FiniteStateMachine):
     def finished(self):
         return self._finished
 
-    def _on_complete(self):
-        if self._frame_current + 1 < self._frame_max:
-            self._frame_current += 1
-        else:
-            self._frame_current = 0
-
     def _move(self, delta, speed: float):
         self.dst.x += speed * delta
-        self.source.x = self._frame_current * _HORSE_SIZE[0]
-        self.source.y = self._animation_y
+        self.mark_dirty()
 
     def _when_starting(self, delta):
         self._move(delta, 25.)
         if self.dst.x >= self._move_target_start:
+            # horses hold their pose until the race starts
+            self._animator.pause(self)
             self.idle()
 
     def _when_idle(self, delta):
@@ -202,7 +211,7 @@ class HorseNode(BaseHorseNode, FiniteStateMachine):
         self._current_speed = self._base_speed + self._acceleration
         if not self._finished and (self.dst.x + _HORSE_SIZE[0] - 12) >= self._target:
             self._finished = True
-            self.scene.results.append(self.horse_name)
+            self.scene.horse_finished(self)
         if self.dst.x < self._move_target_finish:
             self._move(delta, self._current_speed)
     
@@ -219,6 +228,47 @@ class HorseNode(BaseHorseNode, FiniteStateMachine):
     def start_race(self):
         self._set_animation("Galloping")
 
+class Leaderboard:
+    """
+    Race standings kept in order between frames, finished horses are pinned to the front
+    in finishing order and the rest are re-sorted by comparing neighbours, which is a
+    single pass unless someone overtook
+    """
+    def __init__(self, horses: list[HorseNode]):
+        self._order = sorted(horses, key=lambda x: x.dst.x, reverse=True)
+        self._finished = 0
+        self._shown = [None] * len(self._order)
+        self._shown_finished = [False] * len(self._order)
+
+    def finish(self, horse: HorseNode):
+        for i in range(self._finished, len(self._order)):
+            if self._order[i] is horse:
+                self._order.insert(self._finished, self._order.pop(i))
+                self._finished += 1
+                return
+
+    def update(self) -> list[tuple[int, str, bool]]:
+        """
+        Returns (place, horse name, finished) for every place that changed since the last update
+        """
+        order = self._order
+        for i in range(self._finished + 1, len(order)):
+            horse = order[i]
+            x = horse.dst.x
+            j = i
+            while j > self._finished and order[j - 1].dst.x < x:
+                order[j] = order[j - 1]
+                j -= 1
+            order[j] = horse
+        changes = []
+        for i, horse in enumerate(order):
+            finished = i < self._finished
+            if self._shown[i] is not horse or self._shown_finished[i] != finished:
+                self._shown[i] = horse
+                self._shown_finished[i] = finished
+                changes.append((i, horse.horse_name, finished))
+        return changes
+
 class GrassNode(SpriteNode):
     width = 16
     height = 16
@@ -312,7 +362,7 @@ class BaseFanNode(SpriteNode):
     size = (19, 32)
 
     def _offset(self):
-        return self.position + self.origin - (Vector2(list(self.__class__.size)) / 2.)
+        return self.world_transform()[0] + self.origin - (Vector2(list(self.__class__.size)) / 2.)
 
 class FanAccessoryNode(BaseFanNode):
     def __init__(self, gender: str, body: int, body_part: str, index: int, **kwargs):
@@ -328,11 +378,12 @@ class FanAccessoryNode(BaseFanNode):
         super().__init__(texture=Texture(f"assets/people/{self.gender}/{path}/{file}0{index}.png"),
                          **kwargs)
 
-    def step(self, delta):
-        self.position = self.parent.position
-        self.origin = self.parent.origin
-        self.source = self.parent.source
-        self.dst = self.parent.dst
+    def _draw_params(self):
+        # accessories are layers drawn in the fan's frame
+        return self.parent._draw_params()
+
+    def _own_bounds(self):
+        return None
 
 class FanNode(BaseFanNode):
     def __init__(self, position: Vector2, **kwargs):
@@ -360,11 +411,14 @@ class StandsNode(Actor):
                                      width=inner_box.x,
                                      height=inner_box.y,
                                      color=(100, 100, 100, 255)))
-        points = [(p[0] + FanNode.size[0], p[1] + FanNode.size[1]) for p in _poisson_disc_sampling(inner_box.x - 50, inner_box.y - 50, 50)]
-        fans = [FanNode(position=p) for p in [Vector2([p[0] + 25, p[1] + 25 - hscreen.y])for p in points]]
-        for fan in sorted(fans, key=lambda x: x.dst.y):
-            self.add_child(fan)
-        self.add_child(FenceNode(height=20, divisions=20))
+        points = [(p[0] + FanNode.size[0], p[1] + FanNode.size[1]) for p in _poisson_disc_sampling(inner_box.x - 50, inner_box.y - 50, 50, seed=random.randrange(_LAYOUT_VARIANTS))]
+        # the sampler's order is already random, so any prefix is an evenly spread crowd
+        self._fans = [FanNode(position=Vector2([p[0] + 25, p[1] + 25 - hscreen.y]), z=1, y_sort=True) for p in points]
+        self._fans_shown = _show_first(self, self._fans, 0, len(self._fans))
+        self.add_child(FenceNode(height=20, divisions=20, z=2))
+
+    def set_density(self, density: float):
+        self._fans_shown = _show_first(self, self._fans, self._fans_shown, round(len(self._fans) * density))
 
 class FlashingLabelNode(LabelNode):
     def __init__(self,
@@ -439,7 +493,6 @@ class ScreenNode(Actor, FiniteStateMachine):
                                      color=(0, 0, 0, 255)))
         label_position = Vector2([position.x, position.y])
         label_line_height = 8
-        odds = random.sample(list(range(1, 100)), _HORSE_COUNT)
         last_position = None
         rainbow_colors = [
             r.Color(255, 0, 0, 0),      # Red
@@ -453,12 +506,17 @@ class ScreenNode(Actor, FiniteStateMachine):
         ]
         self._horse_names = horse_names
         self._label_positions = []
+        self._odds_labels = []
+        fades = []
         for i, name in enumerate(horse_names):
             label = LabelNode(name="HorseLabel",
-                              text=f"{name}: #{i+1} ({odds[i]}/{odds[i]*5})",
+                              text=self._odds_text(i, BettingPool.format_odds(None)),
                               font=r.get_font_default(),
                               font_size=20,
-                              color=rainbow_colors[i])
+                              color=rainbow_colors[i],
+                              # live odds change several times a second, a texture per string isn't worth it
+                              baked=False,
+                              z=1)
             p = label_position - (Vector2([0., label.height]) / 2.)
             p.y -= size.y / 2. - (label.height + padding)
             label_position.y += label.height + label_line_height
@@ -466,108 +524,194 @@ class ScreenNode(Actor, FiniteStateMachine):
             self._label_positions.append(p)
             last_position = p
             self.add_child(label)
-            self.add_child(ActionSequence(actions=[WaitAction(duration=(i + 1) * .25),
-                                                   ActionNode(target=255,
-                                                              field="color.a",
-                                                              actor=label,
-                                                              easing=ease_linear_in)]))
+            self._odds_labels.append(label)
+            fades.append(Sequence([Wait((i + 1) * .25),
+                                   Tween(label, "color.a", 255, easing=ease_linear_in)]))
+        self.add_child(TimelineNode(Parallel(fades)))
         self.flashing_label = FlashingLabelNode(text="Place your bets!",
                                                 duration_on=.5,
                                                 duration_off=.5,
                                                 font=r.get_font_default(),
                                                 font_size=20,
-                                                color=r.Color(255, 0, 0, 255))
+                                                color=r.Color(255, 0, 0, 255),
+                                                baked=True,
+                                                z=1)
         self.flashing_label.position = last_position + Vector2([0, self.flashing_label.height + label_line_height * 2])
         self.add_child(self.flashing_label)
 
+    def _odds_text(self, i: int, odds: str) -> str:
+        return f"{self._horse_names[i]}: #{i+1} ({odds})"
+
+    def update_odds(self, changes: list[tuple[int, str]]):
+        """
+        Rewrite the odds of the horses listed, the rest keep their baked labels
+        """
+        for i, odds in changes:
+            self._odds_labels[i].text = self._odds_text(i, odds)
+
     def start_race(self):
         self.flashing_label.enabled = False
         self.remove_children(name="HorseLabel")
+        self._odds_labels = []
+        self._race_labels = {}
+        self._winner = None
         for i, name in enumerate(self._horse_names):
-            self.add_child(LabelNode(name=name,
-                                     text=name,
-                                     position=self._label_positions[i],
-                                     font=r.get_font_default(),
-                                     font_size=20,
-                                     color=r.Color(255, 0, 0, 255)))
+            label = LabelNode(name=name,
+                              text=name,
+                              position=self._label_positions[i],
+                              font=r.get_font_default(),
+                              font_size=20,
+                              color=r.Color(255, 0, 0, 255),
+                              baked=True,
+                              z=1)
+            self._race_labels[name] = label
+            self.add_child(label)
 
     def finish_race(self):
         self.remove_children(name="HorseLabel")
         self.remove_children(name="Winner")
-
-    def update_labels(self, horses: list[tuple[str, bool]]):
-        for i, (name, finished) in enumerate(horses):
-            label = self.find_child(name=name)
+        self._winner = None
+
+    def update_labels(self, changes: list[tuple[int, str, bool]]):
+        """
+        Apply leaderboard changes, only the places listed are touched
+        """
+        for i, name, finished in changes:
+            label = self._race_labels[name]
             label.position = self._label_positions[i]
             if finished:
-                if not self.find_child(name="Winner"):
+                if self._winner is None:
                     winner = FlashingLabelNode(name="Winner",
                                                text=f"Winner: {name}!",
                                                duration_on=.5,
                                                duration_off=.5,
                                                font=r.get_font_default(),
                                                font_size=20,
-                                               color=r.Color(0, 255, 0, 255))
+                                               color=r.Color(0, 255, 0, 255),
+                                               baked=True,
+                                               z=1)
                     winner.position = self._label_positions[-1] + Vector2([0, winner.height + 16])
                     self.add_child(winner)
+                    self._winner = winner
                 label.color = (0, 255 - (i * 20), 0, 255)
             else:
                 label.color = (255 - (i * 10), 0, 0, 255)
 
+@register_scene
 class HorseRaces(Scene):
     states = ["PreRace", "Race", "PostRace"]
     transitions = [
         Transition(trigger="start", source="PreRace", dest="Race", before="start_race"),
         Transition(trigger="finish", source="Race", dest="PostRace", before="finish_race"),
-        Transition(trigger="restart", source="PostRace", dest="PreRace"),
+        Transition(trigger="restart", source="PostRace", dest="PreRace", after="new_round"),
     ]
     background_color = (129, 186, 68, 255)
+    # seconds between odds board updates, bets in between are folded into one update
+    board_interval = .25
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self._horse_names = open("assets/names.txt", "r").read().split("\n")
+        self._horse_names = Text("assets/names.txt").split("\n")
         self.results = []
+        self.pool = None
+        self._board_elapsed = 0.
     
     def add_horses(self, names: list[str]):
         self.remove_children(name=f"Horse")
         for i, breed in enumerate(random.sample(list(range(1, _HORSE_COUNT + 1)), _HORSE_COUNT)):
-            self.add_child(HorseNode(breed=breed, number=i, race_name=names[i], name="Horse"))
+            horse = HorseNode(breed=breed, number=i, race_name=names[i], name="Horse", z=6, y_sort=True)
+            horse.show_customizations(quality_level().customizations)
+            self.add_child(horse)
 
     def enter(self):
+        self.culling = True
+        # grass, stands (1-3), checkerboard, finish line, horses and the screen (7-8) each get their own layer
+        self.render_queue = True
         screen, hscreen = _screen_size()
-        for p in _poisson_disc_sampling(screen.x, screen.y, 50):
-            self.add_child(GrassNode(Vector2([p[0], p[1]]) - hscreen))
+        self._grass = [GrassNode(Vector2([p[0], p[1]]) - hscreen, static=True)
+                       for p in _poisson_disc_sampling(screen.x, screen.y, 50, seed=random.randrange(_LAYOUT_VARIANTS))]
+        self._grass_shown = _show_first(self, self._grass, 0, len(self._grass))
         self._target = hscreen.x - _HORSE_SIZE[0]
-        self.add_child(StandsNode())
+        self._stands = StandsNode(static=True, z=1)
+        self.add_child(self._stands)
         self.add_child(CheckerboardNode(position=Vector2([self._target + (_HORSE_SIZE[0] / 2.),
                                                           hscreen.y / 2.]),
-                                        size=Vector2([_HORSE_SIZE[0], hscreen.y])))
+                                        size=Vector2([_HORSE_SIZE[0], hscreen.y]),
+                                        static=True,
+                                        z=4))
         self.add_child(LineNode(position=Vector2([self._target, 0]),
                                 end=Vector2([self._target, screen.y]),
                                 thickness=3,
-                                color=(255, 0, 0, 255)))
+                                color=(255, 0, 0, 255),
+                                static=True,
+                                z=5))
+        self.new_round()
+        self.apply_quality(quality_level())
+        on_quality_change(self.apply_quality)
+
+    def apply_quality(self, level: QualityLevel):
+        self._stands.set_density(level.crowd)
+        self._grass_shown = _show_first(self, self._grass, self._grass_shown, round(len(self._grass) * level.grass))
+        for horse in self.find_children(name="Horse"):
+            horse.show_customizations(level.customizations)
+
+    def reenter(self):
+        # the track and crowd are kept while suspended, only a finished race needs new horses
+        if self.state == "PostRace":
+            self.restart()
+
+    def new_round(self):
+        self.remove_children(name="Screen")
         names = _shuffled(random.sample(self._horse_names, _HORSE_COUNT))
         self.add_horses(names)
-        self.add_child(ScreenNode(name="Screen", horse_names=names))
+        self.pool = BettingPool(_HORSE_COUNT)
+        self._board_elapsed = 0.
+        self._screen = ScreenNode(name="Screen", horse_names=names, z=7)
+        self.add_child(self._screen)
         self.add_child(TimerNode(duration=5.,
                                  on_complete=self.start))
     
+    def place_bet(self, number: int, amount: int):
+        """
+        Stake `amount` on horse `number` as shown on the board (#1 to #8)
+        Raises PoolClosedError outside the betting window and ValueError for an unknown horse or bad amount
+        """
+        if self.pool is None:
+            raise PoolClosedError()
+        self.pool.bet(number - 1, amount)
+
     def start_race(self):
-        for horse in self.find_children(name="Horse"):
+        self.pool.close()
+        horses = self.find_children(name="Horse")
+        for horse in horses:
             horse.race()
-        self.find_child("Screen").start()
-    
+        self._leaderboard = Leaderboard(horses)
+        self._screen.start()
+
+    def horse_finished(self, horse: HorseNode):
+        self.results.append(horse.horse_name)
+        self._leaderboard.finish(horse)
+        if len(self.results) == _HORSE_COUNT:
+            self.add_child(TimerNode(name="RestartTimer",
+                                     duration=5.,
+                                     on_complete=self.finish))
+
     def finish_race(self):
         self.results = []
+        self._leaderboard = None
         self.remove_children(name="Horse")
-        self.find_child("Screen").finish()
+        self._screen.finish()
 
     def step(self, delta):
-        if self.state == "Race":
-            horses = [(horse, True) for horse in self.results] + [(horse.horse_name, False) for horse in sorted(self.find_children(name="Horse"), reverse=True, key=lambda x: x.dst.x) if not horse.finished]
-            self.find_child("Screen").update_labels(horses)
-            if len(self.results) == _HORSE_COUNT and not self.find_child(name="RestartTimer"):
-                self.add_child(TimerNode(name="RestartTimer",
-                                         duration=5.,
-                                         on_complete=self.finish))
+        if self.state == "PreRace":
+            self._board_elapsed += delta
+            if self._board_elapsed >= self.board_interval:
+                self._board_elapsed = 0.
+                changes = self.pool.publish()
+                if changes:
+                    self._screen.update_odds(changes)
+        elif self.state == "Race":
+            changes = self._leaderboard.update()
+            if changes:
+                self._screen.update_labels(changes)
         super().step(delta)
\ No newline at end of file
@@ -1,6 +1,7 @@
-from ..scene import Scene
+from ..scene import Scene, register_scene
 import pyray as r
 
+@register_scene
 class Roulette(Scene):
     background_color = (0, 0, 255, 255)
 
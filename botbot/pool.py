@@ -0,0 +1,110 @@
+# spritekit/pool.py
+#
+# Copyright (C) 2025 George Watson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+
+__all__ = ["PoolClosedError", "BettingPool"]
+
+class PoolClosedError(Exception):
+    def __str__(self):
+        return "Betting is closed for this round"
+
+class BettingPool:
+    """
+    Pari-mutuel pool for one round, winners split everything staked less the `takeout`
+
+    A bet only adds to two running totals, so it is O(1) and safe to call from the chat thread.
+    Odds are worked out from the totals when the board is published, and only outcomes whose
+    displayed odds changed are reported
+    """
+    def __init__(self, outcomes: int, takeout: float = .15, minimum: float = .05):
+        self.takeout = takeout
+        # odds never shown below this, as tracks pay a minimum on heavy favourites
+        self.minimum = minimum
+        self.total = 0
+        self.bets = 0
+        self.closed = False
+        self._totals = [0] * outcomes
+        # boards start out showing no odds for every outcome
+        self._shown = [self.format_odds(None)] * outcomes
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def bet(self, outcome: int, amount: int):
+        """
+        Stake `amount` on the 0-based `outcome`
+        """
+        if not 0 <= outcome < len(self._totals):
+            raise ValueError(f"No outcome `{outcome}`, expected 0 to {len(self._totals) - 1}")
+        if amount <= 0:
+            raise ValueError(f"Bet amount must be positive, got `{amount}`")
+        with self._lock:
+            if self.closed:
+                raise PoolClosedError()
+            self._totals[outcome] += amount
+            self.total += amount
+            self.bets += 1
+            self._dirty = True
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+
+    def staked(self, outcome: int) -> int:
+        return self._totals[outcome]
+
+    def odds(self, outcome: int) -> float | None:
+        """
+        Current odds to 1 on `outcome`, None until someone has bet on it
+        """
+        staked = self._totals[outcome]
+        if not staked:
+            return None
+        return max(self.total * (1. - self.takeout) / staked - 1., self.minimum)
+
+    def payout(self, outcome: int, amount: int) -> float:
+        """
+        What a winning bet of `amount` on `outcome` returns, stake included
+        """
+        odds = self.odds(outcome)
+        return 0. if odds is None else amount * (odds + 1.)
+
+    @staticmethod
+    def format_odds(odds: float | None) -> str:
+        if odds is None:
+            return "--"
+        # a tenth of a point below 10/1 and whole points above, so small swings don't churn the board
+        return f"{odds:.1f}/1" if odds < 10. else f"{round(odds)}/1"
+
+    def publish(self) -> list[tuple[int, str]]:
+        """
+        Displayed odds that changed since the last publish, as (outcome, text)
+        """
+        with self._lock:
+            if not self._dirty:
+                return []
+            self._dirty = False
+            totals = list(self._totals)
+            total = self.total
+        changes = []
+        scale = total * (1. - self.takeout)
+        for i, staked in enumerate(totals):
+            text = self.format_odds(max(scale / staked - 1., self.minimum) if staked else None)
+            if text != self._shown[i]:
+                self._shown[i] = text
+                changes.append((i, text))
+        return changes
@@ -0,0 +1,183 @@
+# spritekit/profiler.py
+#
+# Copyright (C) 2025 George Watson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from .actor import Actor
+from .render import RecordingBackend, get_backend, set_backend
+import pyray as r
+from collections import defaultdict
+from functools import wraps
+from time import perf_counter
+from typing import Optional
+import gc
+import json
+import sys
+
+__all__ = ["Profiler"]
+
+def _subclasses(cls):
+    yield cls
+    for sub in cls.__subclasses__():
+        yield from _subclasses(sub)
+
+class Profiler:
+    """
+    Opt-in frame profiler, times `step` and `draw` for every Actor class and counts draw calls and texture switches
+
+    For each class it keeps the number of calls, inclusive time (the whole subtree under that actor)
+    and self time (excluding child actors). Actor draws only submit commands, the raylib calls run
+    later in `flush` and are timed per command as `<COMMAND>.replay`, with the whole flush kept as
+    `flush_ms`. Each frame is appended to `output` as a json line
+    """
+    def __init__(self, output: Optional[str] = None, overlay: bool = True, top: int = 12):
+        self.overlay = overlay
+        self.top = top
+        self._output = open(output, "w") if output else None
+        self._stack = []
+        self._patched = []
+        self._frame = defaultdict(lambda: [0, 0., 0.])
+        self._last = {}
+        self._recorder = None
+        self._backend = None
+        self._gc_collections = 0
+        self._frame_start = 0.
+        self._blocks = 0
+        self._frame_count = 0
+        self.frame_time = 0.
+        self.draw_calls = 0
+        self.texture_changes = 0
+        self.flush_time = 0.
+        self.allocated_blocks = 0
+        self.gc_collections = 0
+
+    def _patch(self, owner, name, replacement):
+        self._patched.append((owner, name, owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    def _timed(self, original, bucket):
+        stack = self._stack
+        frame = self._frame
+        @wraps(original)
+        def wrapper(actor, *args, **kwargs):
+            # super() calls on the same actor are folded into the outermost one
+            if stack and stack[-1][0] is actor:
+                return original(actor, *args, **kwargs)
+            entry = [actor, 0.]
+            stack.append(entry)
+            start = perf_counter()
+            try:
+                return original(actor, *args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                stack.pop()
+                if stack:
+                    stack[-1][1] += elapsed
+                stat = frame[(actor.__class__.__name__, bucket)]
+                stat[0] += 1
+                stat[1] += elapsed
+                stat[2] += elapsed - entry[1]
+        return wrapper
+
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            self._gc_collections += 1
+
+    def enable(self):
+        """
+        Instrument every Actor class defined so far and record the draw commands replayed each frame
+        """
+        if self._patched:
+            return
+        for cls in set(_subclasses(Actor)):
+            for method in ("step", "draw"):
+                if method in cls.__dict__:
+                    self._patch(cls, method, self._timed(cls.__dict__[method], method))
+        self._recorder = RecordingBackend(forward=get_backend(), timed=True)
+        self._backend = set_backend(self._recorder)
+        gc.callbacks.append(self._on_gc)
+
+    def disable(self):
+        """
+        Restore everything patched by `enable`
+        """
+        for owner, name, original in reversed(self._patched):
+            setattr(owner, name, original)
+        self._patched = []
+        if self._recorder is not None:
+            set_backend(self._backend)
+            self._recorder = self._backend = None
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self._output:
+            self._output.close()
+            self._output = None
+
+    def begin_frame(self):
+        self._frame.clear()
+        if self._recorder is not None:
+            self._recorder.reset()
+        self._gc_collections = 0
+        self._blocks = sys.getallocatedblocks()
+        self._frame_start = perf_counter()
+
+    def end_frame(self):
+        self.frame_time = perf_counter() - self._frame_start
+        if self._recorder is not None:
+            self.draw_calls = self._recorder.draw_calls
+            self.texture_changes = self._recorder.texture_changes
+            self.flush_time = self._recorder.replay_time
+            for command, elapsed in self._recorder.times.items():
+                calls = self._recorder.counts[command]
+                self._frame[(command.name, "replay")] = [calls, elapsed, elapsed]
+        self.allocated_blocks = sys.getallocatedblocks() - self._blocks
+        self.gc_collections = self._gc_collections
+        self._last = {k: tuple(v) for k, v in self._frame.items()}
+        self._frame_count += 1
+        if self._output:
+            self._output.write(json.dumps(self.report()) + "\n")
+
+    def report(self):
+        """
+        Stats for the last completed frame, times are in milliseconds
+        """
+        return {
+            "frame": self._frame_count,
+            "frame_ms": self.frame_time * 1000.,
+            "draw_calls": self.draw_calls,
+            "texture_changes": self.texture_changes,
+            "flush_ms": self.flush_time * 1000.,
+            "allocated_blocks": self.allocated_blocks,
+            "gc_collections": self.gc_collections,
+            "actors": [{"class": name,
+                        "method": method,
+                        "calls": calls,
+                        "total_ms": total * 1000.,
+                        "self_ms": own * 1000.} for (name, method), (calls, total, own) in self._last.items()]
+        }
+
+    def draw_overlay(self, x: int = 10, y: int = 10, font_size: int = 10):
+        """
+        Draw the hottest classes of the last frame by self time, call after the scene has been drawn
+        """
+        if not self.overlay:
+            return
+        rows = sorted(self._last.items(), key=lambda kv: kv[1][2], reverse=True)[:self.top]
+        lines = [f"{self.frame_time * 1000.:.2f}ms  flush:{self.flush_time * 1000.:.2f}ms  draws:{self.draw_calls}/{self.texture_changes}  blocks:{self.allocated_blocks:+d}  gc:{self.gc_collections}"]
+        lines += [f"{name}.{method} x{calls}  {own * 1000.:.2f}/{total * 1000.:.2f}ms" for (name, method), (calls, total, own) in rows]
+        line_height = font_size + 2
+        r.draw_rectangle(x - 4, y - 4, 380, line_height * len(lines) + 8, (0, 0, 0, 180))
+        for i, line in enumerate(lines):
+            r.draw_text(line, x, y + i * line_height, font_size, r.RAYWHITE)
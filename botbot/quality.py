@@ -0,0 +1,181 @@
+# spritekit/quality.py
+#
+# Copyright (C) 2025 George Watson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from .telemetry import Histogram
+from .actor import LabelNode
+from .render import get_render_target
+from dataclasses import dataclass, replace
+from time import perf_counter
+from typing import Optional, Callable
+import json
+
+__all__ = ["QualityLevel", "QUALITY_LEVELS", "quality_level", "set_quality", "on_quality_change", "QualityGovernor"]
+
+@dataclass(frozen=True)
+class QualityLevel:
+    name: str
+    # fraction of the crowd and grass that is shown
+    crowd: float = 1.
+    grass: float = 1.
+    # marking and hair layers on horses
+    customizations: bool = True
+    # bake every label to a texture, not just the ones that ask for it
+    bake_labels: bool = False
+    # internal resolution relative to the render target's size when the governor started
+    resolution: float = 1.
+
+# ordered from best looking to cheapest, each step gives up the least noticeable detail first
+QUALITY_LEVELS = [
+    QualityLevel("high"),
+    QualityLevel("medium", crowd=.6, bake_labels=True),
+    QualityLevel("low", crowd=.4, grass=.5, customizations=False, bake_labels=True, resolution=.75),
+    QualityLevel("minimum", crowd=.2, grass=.25, customizations=False, bake_labels=True, resolution=.5),
+]
+
+_level = QUALITY_LEVELS[0]
+_listeners = []
+
+def quality_level() -> QualityLevel:
+    return _level
+
+def set_quality(level: QualityLevel):
+    """
+    Switch quality level and tell every listener, games apply the parts they own
+    """
+    global _level
+    if level == _level:
+        return
+    _level = level
+    LabelNode.bake_all = level.bake_labels
+    for listener in list(_listeners):
+        listener(level)
+
+def on_quality_change(listener: Callable[[QualityLevel], None]):
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+class QualityGovernor:
+    """
+    Watches how long frames take to step and draw and moves through `levels` to stay inside the frame budget
+
+    Every `window` seconds the p95 busy time is compared with the budget: above `degrade` of it drops
+    a level straight away, below `upgrade` for `patience` windows in a row goes back up one. Each
+    change is logged as a json line to `output` or stdout and kept in `changes`
+
+    `resolution` needs a render target (config['resolution'] in BotBot.run). Without one it is
+    ignored, and levels that would only differ from the current one in resolution are skipped
+    """
+    def __init__(self,
+                 fps: float = 60.,
+                 levels: list[QualityLevel] = QUALITY_LEVELS,
+                 window: float = 2.,
+                 degrade: float = .9,
+                 upgrade: float = .5,
+                 patience: int = 3,
+                 output: Optional[str] = None):
+        self.budget = 1. / fps
+        self.levels = levels
+        self.window = window
+        self.degrade = degrade
+        self.upgrade = upgrade
+        self.patience = patience
+        self.changes = []
+        self._output = output
+        self._index = levels.index(quality_level()) if quality_level() in levels else 0
+        self._histogram = Histogram()
+        self._window_start = perf_counter()
+        self._calm = 0
+        target = get_render_target()
+        self._base_resolution = (target.width, target.height) if target is not None else None
+
+    @property
+    def level(self) -> QualityLevel:
+        return self.levels[self._index]
+
+    def _effective(self, level: QualityLevel) -> QualityLevel:
+        if self._base_resolution is None:
+            return replace(level, name="", resolution=1.)
+        return replace(level, name="")
+
+    def _neighbour(self, step: int) -> Optional[int]:
+        """
+        The nearest level in direction `step` that actually changes something
+        """
+        current = self._effective(self.level)
+        index = self._index + step
+        while 0 <= index < len(self.levels):
+            target = self._effective(self.levels[index])
+            if target != current:
+                # going up, land on the best of several equivalent levels
+                while step < 0 and index > 0 and self._effective(self.levels[index - 1]) == target:
+                    index -= 1
+                return index
+            index += step
+        return None
+
+    def record(self, busy: float):
+        """
+        Add one frame's step and draw time in seconds, excluding any wait for vsync or the fps limit
+        """
+        self._histogram.add(busy)
+        now = perf_counter()
+        if now - self._window_start < self.window:
+            return
+        p95 = self._histogram.percentile(95)
+        self._histogram.reset()
+        self._window_start = now
+        if p95 > self.budget * self.degrade and (lower := self._neighbour(1)) is not None:
+            self._calm = 0
+            self.set_level(lower, p95)
+        elif p95 < self.budget * self.upgrade and (higher := self._neighbour(-1)) is not None:
+            self._calm += 1
+            if self._calm >= self.patience:
+                self._calm = 0
+                self.set_level(higher, p95)
+        else:
+            self._calm = 0
+
+    def set_level(self, index: int, p95: Optional[float] = None):
+        index = max(0, min(index, len(self.levels) - 1))
+        if index == self._index:
+            return
+        change = {"time": perf_counter(),
+                  "from": self.level.name,
+                  "to": self.levels[index].name,
+                  "p95_ms": p95 * 1000. if p95 is not None else None,
+                  "budget_ms": self.budget * 1000.}
+        self.changes.append(change)
+        self._index = index
+        level = self.level
+        target = get_render_target()
+        if target is not None and self._base_resolution is not None:
+            target.resize(self._base_resolution[0] * level.resolution, self._base_resolution[1] * level.resolution)
+        set_quality(level)
+        line = json.dumps(change)
+        if self._output:
+            with open(self._output, "a") as f:
+                f.write(line + "\n")
+        else:
+            print(line)
+
+    def revert(self):
+        """
+        Undo the most recent level change
+        """
+        if self.changes:
+            previous = self.changes[-1]["from"]
+            self.set_level(next(i for i, level in enumerate(self.levels) if level.name == previous))
@@ -18,10 +18,17 @@
 import pyray as r
 import raylib as rl
 import os
+import json
+import mmap
+import struct
 import pathlib
 from enum import Enum
+from .audio import release_voices, unstream_music
 
-__all__ = ["Image", "Texture", "TextureFromImage", "Shader", "ShaderFromMemory", "Model", "Wave", "Sound", "Music", "Font", "Keys", "Flags", "Keyboard", "Gamepad", "Mouse", "Color", "Rectangle", "unload_cache"]
+__all__ = ["Image", "Texture", "TextureFromImage", "Shader", "ShaderFromMemory", "Model", "Wave", "Sound", "Music", "Font", "Keys", "Flags", "Keyboard", "Gamepad", "Mouse", "Color", "Rectangle", "unload_cache", "clear_asset_index",
+           "scan_assets", "save_manifest", "load_manifest", "missing_assets",
+           "Text", "Bundle", "build_bundle", "mount_bundle", "unmount_bundle",
+           "InputSnapshot", "poll_input", "input_snapshot", "record_input", "stop_recording", "replay_input"]
 
 __SKPATH__ = pathlib.Path(__file__).parent
 __SKDATA__ = "assets"
@@ -33,6 +40,10 @@ __fshader_extensions = ['.fs.glsl', '.fsh', '.frag']
 __sound_extensions = ['.wav', '.mp3', '.ogg', '.flac', '.xm', '.mod', '.qoa']
 __font_extensions = ['.ttf', '.otf', '.fnt']
 __cache = {}
+__manifest = {}
+__resolved = {}
+__bundle = None
+__mapped = set()
 
 def _gen_file_paths(name, extensions, folders):
     paths = []
@@ -43,17 +54,187 @@ def _gen_file_paths(name, extensions, folders):
             paths.append(str(__SKPATH__ / folder / name) + ext)
     return paths
 
+def _list_dir(path):
+    path = os.path.normpath(path)
+    if path not in __manifest:
+        try:
+            __manifest[path] = frozenset(e.name for e in os.scandir(path) if e.is_file())
+        except OSError:
+            __manifest[path] = frozenset()
+    return __manifest[path]
+
+def _is_file(path):
+    path = os.path.normpath(path)
+    if __bundle is not None and path in __bundle:
+        return True
+    head, tail = os.path.split(path)
+    return tail in _list_dir(head or '.')
+
+def scan_assets(root: str = __SKDATA__):
+    """
+    Walk `root` once and index every file under it, so later lookups never touch the disk
+    """
+    for folder, _, files in os.walk(root):
+        __manifest[os.path.normpath(folder)] = frozenset(files)
+    return __manifest
+
+def save_manifest(file: str):
+    """
+    Write the current asset index to a json manifest
+    """
+    with open(file, "w") as f:
+        json.dump({k: sorted(v) for k, v in __manifest.items()}, f, indent=1)
+
+def load_manifest(file: str):
+    """
+    Replace the asset index with a prebuilt json manifest
+    """
+    with open(file, "r") as f:
+        data = json.load(f)
+    __manifest.clear()
+    __resolved.clear()
+    for k, v in data.items():
+        __manifest[os.path.normpath(k)] = frozenset(v)
+
+def clear_asset_index():
+    """
+    Forget the asset index and every resolved lookup, folders are listed again on demand
+    """
+    __manifest.clear()
+    __resolved.clear()
+
+def missing_assets():
+    """
+    Check the asset index against the filesystem, returns every indexed path that no longer exists
+    """
+    return [os.path.join(k, f) for k, v in __manifest.items() for f in v if not os.path.isfile(os.path.join(k, f))]
+
 def find_file(name, extensions, folders):
+    key = (name, tuple(extensions), tuple(folders))
+    if key in __resolved:
+        return __resolved[key]
     _, ext = os.path.splitext(name)
-    if ext and ext in extensions:
-        if os.path.isfile(name):
-            return name
+    if ext and ext in extensions and _is_file(name):
+        __resolved[key] = name
+        return name
     for file in _gen_file_paths(name, extensions, folders):
-        print("trying ",file)
-        if os.path.isfile(file):
+        if _is_file(file):
+            __resolved[key] = file
             return file
     raise Exception(f"file {name} does not exist")
 
+_BUNDLE_MAGIC = b"BBPK"
+_BUNDLE_VERSION = 1
+_BUNDLE_HEADER = struct.Struct("<4sII")
+_BUNDLE_ALIGN = 16
+
+def _align(n):
+    return (n + _BUNDLE_ALIGN - 1) & ~(_BUNDLE_ALIGN - 1)
+
+def build_bundle(output: str, root: str = __SKDATA__, decode_images: bool = True):
+    """
+    Pack every file under `root` into a single indexed bundle, images are stored as raw pixel data
+    """
+    index = {}
+    blobs = []
+    offset = 0
+    for folder, _, files in os.walk(root):
+        for file in sorted(files):
+            path = os.path.normpath(os.path.join(folder, file))
+            ext = os.path.splitext(file)[1].lower()
+            if decode_images and ext in __image_extensions:
+                image = r.load_image(path)
+                size = r.get_pixel_data_size(image.width, image.height, image.format)
+                data = bytes(rl.ffi.buffer(image.data, size))
+                entry = {"kind": "image",
+                         "width": image.width,
+                         "height": image.height,
+                         "mipmaps": image.mipmaps,
+                         "format": image.format}
+                r.unload_image(image)
+            else:
+                with open(path, "rb") as f:
+                    data = f.read()
+                entry = {"kind": "file"}
+            entry.update(offset=offset, size=len(data), ext=ext)
+            index[path] = entry
+            blobs.append(data)
+            offset = _align(offset + len(data))
+    header = json.dumps(index).encode("utf-8")
+    with open(output, "wb") as f:
+        f.write(_BUNDLE_HEADER.pack(_BUNDLE_MAGIC, _BUNDLE_VERSION, len(header)))
+        f.write(header)
+        f.write(bytes(_align(f.tell()) - f.tell()))
+        for data in blobs:
+            f.write(data)
+            f.write(bytes(_align(len(data)) - len(data)))
+
+class Bundle:
+    """
+    Read-only view of a packed asset bundle, entries are served straight from the mapped file
+    """
+    def __init__(self, file: str):
+        self._file = open(file, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = _BUNDLE_HEADER.unpack_from(self._map, 0)
+        if magic != _BUNDLE_MAGIC or version != _BUNDLE_VERSION:
+            raise RuntimeError(f"{file} is not a valid asset bundle")
+        self._index = json.loads(self._map[_BUNDLE_HEADER.size:_BUNDLE_HEADER.size + size])
+        self._base = _align(_BUNDLE_HEADER.size + size)
+        self._buffer = rl.ffi.from_buffer(self._map)
+
+    def __contains__(self, path: str):
+        return os.path.normpath(path) in self._index
+
+    def entry(self, path: str):
+        return self._index[os.path.normpath(path)]
+
+    def pointer(self, path: str):
+        entry = self.entry(path)
+        return rl.ffi.cast("unsigned char *", self._buffer) + self._base + entry["offset"], entry["size"]
+
+    def view(self, path: str):
+        entry = self.entry(path)
+        start = self._base + entry["offset"]
+        return memoryview(self._map)[start:start + entry["size"]]
+
+    def image(self, path: str):
+        entry = self.entry(path)
+        if entry["kind"] != "image":
+            data, size = self.pointer(path)
+            return r.load_image_from_memory(entry["ext"], data, size)
+        data, _ = self.pointer(path)
+        return r.Image(data, entry["width"], entry["height"], entry["mipmaps"], entry["format"])
+
+    def close(self):
+        self._buffer = None
+        self._map.close()
+        self._file.close()
+
+def mount_bundle(file: str):
+    """
+    Serve assets from a packed bundle, files missing from the bundle still load from disk
+    """
+    global __bundle
+    unmount_bundle()
+    __bundle = Bundle(file)
+    __resolved.clear()
+    return __bundle
+
+def unmount_bundle():
+    global __bundle
+    if __bundle is not None:
+        for key in [k for k in __cache if k in __mapped]:
+            _unload_asset(key)
+        __bundle.close()
+        __bundle = None
+        __resolved.clear()
+
+def _bundled(file: str):
+    if __bundle is not None and file in __bundle:
+        return __bundle
+    return None
+
 class CacheEntry(Enum):
     MODEL = 0
     TEXTURE = 1
@@ -83,14 +264,17 @@ def _unload_asset(key: str):
         case CacheEntry.TEXTURE:
             r.unload_texture(result)
         case CacheEntry.IMAGE:
-            r.unload_image(result)
+            if key not in __mapped:
+                r.unload_image(result)
         case CacheEntry.FONT:
             r.unload_font(result)
         case CacheEntry.WAVE:
             r.unload_wave(result)
         case CacheEntry.SOUND:
+            release_voices(result)
             r.unload_sound(result)
         case CacheEntry.MUSIC:
+            unstream_music(result)
             r.unload_music_stream(result)
         case _:
             try:
@@ -98,6 +282,7 @@ def _unload_asset(key: str):
             except:
                 pass
     __cache.pop(key)
+    __mapped.discard(key)
 
 def unload_cache(key: str = None):
     if key:
@@ -111,11 +296,24 @@ def _file_locations(name):
 
 @cache_result(ctype=CacheEntry.IMAGE)
 def Image(file: str):
-    return r.load_image(find_file(file, __image_extensions, _file_locations('textures')))
+    path = find_file(file, __image_extensions, _file_locations('textures'))
+    if bundle := _bundled(path):
+        image = bundle.image(path)
+        if bundle.entry(path)["kind"] == "image":
+            __mapped.add(file)
+        return image
+    return r.load_image(path)
 
 @cache_result(ctype=CacheEntry.TEXTURE)
 def Texture(file: str):
-    return r.load_texture(find_file(file, __image_extensions, _file_locations('textures')))
+    path = find_file(file, __image_extensions, _file_locations('textures'))
+    if bundle := _bundled(path):
+        image = bundle.image(path)
+        texture = r.load_texture_from_image(image)
+        if bundle.entry(path)["kind"] != "image":
+            r.unload_image(image)
+        return texture
+    return r.load_texture(path)
 
 def TextureFromImage(image: r.Image):
     return r.load_texture_from_image(image)
@@ -131,9 +329,15 @@ def ShaderFromMemory(vertex: str, fragment: str):
 def Model(file: str):
     return r.load_model(find_file(file, __model_extensions, _file_locations('models')))
 
+def _load_wave(path: str):
+    if bundle := _bundled(path):
+        data, size = bundle.pointer(path)
+        return r.load_wave_from_memory(bundle.entry(path)["ext"], data, size)
+    return r.load_wave(path)
+
 @cache_result(ctype=CacheEntry.WAVE)
 def Wave(file: str):
-    return r.load_wave(find_file(file, __sound_extensions, _file_locations('audio')))
+    return _load_wave(find_file(file, __sound_extensions, _file_locations('audio')))
 
 @cache_result(ctype=CacheEntry.SOUND)
 def Sound(file):
@@ -141,16 +345,41 @@ def Sound(file):
         return r.load_sound_from_wave(file)
     else:
         def _load(file):
-            return r.load_sound(find_file(file, __sound_extensions, _file_locations('audio')))
+            path = find_file(file, __sound_extensions, _file_locations('audio'))
+            if _bundled(path):
+                wave = _load_wave(path)
+                sound = r.load_sound_from_wave(wave)
+                r.unload_wave(wave)
+                return sound
+            return r.load_sound(path)
         return _load(file)
 
 @cache_result(ctype=CacheEntry.MUSIC)
 def Music(file: str):
-    return r.load_music_stream(find_file(file, __sound_extensions, _file_locations('audio')))
+    path = find_file(file, __sound_extensions, _file_locations('audio'))
+    if bundle := _bundled(path):
+        data, size = bundle.pointer(path)
+        __mapped.add(file)
+        return r.load_music_stream_from_memory(bundle.entry(path)["ext"], data, size)
+    return r.load_music_stream(path)
 
 @cache_result(ctype=CacheEntry.FONT)
 def Font(file: str):
-    return r.load_font(find_file(file, __font_extensions, _file_locations('fonts')))
+    path = find_file(file, __font_extensions, _file_locations('fonts'))
+    if (bundle := _bundled(path)) and bundle.entry(path)["ext"] in ['.ttf', '.otf']:
+        data, size = bundle.pointer(path)
+        return r.load_font_from_memory(bundle.entry(path)["ext"], data, size, 32, rl.ffi.NULL, 0)
+    return r.load_font(path)
+
+def Text(file: str):
+    """
+    Read a text asset, from the mounted bundle if it has one
+    """
+    path = find_file(file, ['.txt'], _file_locations('.'))
+    if bundle := _bundled(path):
+        return bytes(bundle.view(path)).decode("utf-8")
+    with open(path, "r") as f:
+        return f.read()
 
 def _fix_key(kname):
     # return is a reserved word, so alias enter to return
@@ -164,9 +393,15 @@ def _fix_key(kname):
 class IFuckingHateYouPython:
     def __init__(self, stupidfuckingidiotfuction):
         self.stupidfuckingidiotfuction = stupidfuckingidiotfuction
+        self._table = {}
 
     def __getattr__(self, kname):
-        return getattr(rl, self.stupidfuckingidiotfuction(kname))
+        # names are resolved once, after that it's a dict lookup
+        try:
+            return self._table[kname]
+        except KeyError:
+            value = self._table[kname] = getattr(rl, self.stupidfuckingidiotfuction(kname))
+            return value
 
 Keys = IFuckingHateYouPython(stupidfuckingidiotfuction=_fix_key)
 
@@ -178,31 +413,174 @@ def _fix_flag(kname):
 
 Flags = IFuckingHateYouPython(stupidfuckingidiotfuction=_fix_flag)
 
+def _key_code(kname: str | r.KeyboardKey | int) -> int:
+    return getattr(Keys, kname) if isinstance(kname, str) else int(kname)
+
+_MOUSE_BUTTONS = (rl.MOUSE_BUTTON_LEFT, rl.MOUSE_BUTTON_RIGHT, rl.MOUSE_BUTTON_MIDDLE)
+_GAMEPAD_AXES = (rl.GAMEPAD_AXIS_LEFT_X, rl.GAMEPAD_AXIS_LEFT_Y, rl.GAMEPAD_AXIS_RIGHT_X, rl.GAMEPAD_AXIS_RIGHT_Y)
+
+class InputSnapshot:
+    """
+    Everything input queries can see for one frame, (down, pressed) pairs keyed by key or button code
+    """
+    __slots__ = ("keys", "mouse_buttons", "mouse_position", "mouse_wheel", "gamepads")
+
+    def __init__(self):
+        self.keys = {}
+        self.mouse_buttons = {}
+        self.mouse_position = (0., 0.)
+        self.mouse_wheel = 0.
+        # gamepad id -> (available, {button: (down, pressed)}, axes)
+        self.gamepads = {}
+
+    def to_dict(self) -> dict:
+        return {
+            "keys": {str(k): v for k, v in self.keys.items()},
+            "mouse_buttons": {str(k): v for k, v in self.mouse_buttons.items()},
+            "mouse_position": self.mouse_position,
+            "mouse_wheel": self.mouse_wheel,
+            "gamepads": {str(k): [available, {str(b): v for b, v in buttons.items()}, axes]
+                         for k, (available, buttons, axes) in self.gamepads.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        snapshot = cls()
+        snapshot.keys = {int(k): tuple(v) for k, v in data["keys"].items()}
+        snapshot.mouse_buttons = {int(k): tuple(v) for k, v in data["mouse_buttons"].items()}
+        snapshot.mouse_position = tuple(data["mouse_position"])
+        snapshot.mouse_wheel = data["mouse_wheel"]
+        snapshot.gamepads = {int(k): (available, {int(b): tuple(v) for b, v in buttons.items()}, tuple(axes))
+                             for k, (available, buttons, axes) in data["gamepads"].items()}
+        return snapshot
+
+# keys and gamepad buttons that have been queried at least once, polled every frame after that
+__watched_keys = set()
+__watched_buttons = {}
+__snapshot = None
+__recording = None
+__replay = None
+
+def _poll_live() -> InputSnapshot:
+    snapshot = InputSnapshot()
+    for key in __watched_keys:
+        snapshot.keys[key] = (rl.IsKeyDown(key), rl.IsKeyPressed(key))
+    for button in _MOUSE_BUTTONS:
+        snapshot.mouse_buttons[button] = (rl.IsMouseButtonDown(button), rl.IsMouseButtonPressed(button))
+    position = rl.GetMousePosition()
+    snapshot.mouse_position = (position.x, position.y)
+    snapshot.mouse_wheel = rl.GetMouseWheelMove()
+    for gamepad, buttons in __watched_buttons.items():
+        if rl.IsGamepadAvailable(gamepad):
+            snapshot.gamepads[gamepad] = (True,
+                                          {b: (rl.IsGamepadButtonDown(gamepad, b), rl.IsGamepadButtonPressed(gamepad, b)) for b in buttons},
+                                          tuple(rl.GetGamepadAxisMovement(gamepad, axis) for axis in _GAMEPAD_AXES))
+        else:
+            snapshot.gamepads[gamepad] = (False, {}, (0.,) * len(_GAMEPAD_AXES))
+    return snapshot
+
+def poll_input() -> InputSnapshot:
+    """
+    Take this frame's input snapshot, call once per frame before anything queries input
+    """
+    global __snapshot, __replay
+    if __replay is not None:
+        try:
+            __snapshot = InputSnapshot.from_dict(next(__replay))
+        except StopIteration:
+            __replay = None
+    if __replay is None:
+        __snapshot = _poll_live()
+    if __recording is not None:
+        __recording.append(__snapshot)
+    return __snapshot
+
+def input_snapshot() -> InputSnapshot | None:
+    return __snapshot
+
+def record_input():
+    """
+    Start recording a snapshot per frame, including keys first queried part way through a frame
+    """
+    global __recording
+    __recording = []
+
+def stop_recording() -> list[dict]:
+    """
+    Stop recording and return the frames as json-friendly dicts, ready for `replay_input`
+    """
+    global __recording
+    frames, __recording = __recording or [], None
+    return [snapshot.to_dict() for snapshot in frames]
+
+def replay_input(frames: list[dict]):
+    """
+    Serve queries from recorded frames instead of the devices, going back to live input once they run out
+    """
+    global __replay
+    __replay = iter(frames)
+
+def _key_state(key: int) -> tuple[bool, bool]:
+    snapshot = __snapshot
+    if snapshot is None:
+        return rl.IsKeyDown(key), rl.IsKeyPressed(key)
+    state = snapshot.keys.get(key)
+    if state is None:
+        __watched_keys.add(key)
+        # the first query for a key goes to the device, replayed frames simply never saw it
+        state = snapshot.keys[key] = (False, False) if __replay is not None else (rl.IsKeyDown(key), rl.IsKeyPressed(key))
+    return state
+
+def _mouse_state(button: int) -> tuple[bool, bool]:
+    snapshot = __snapshot
+    if snapshot is None:
+        return rl.IsMouseButtonDown(button), rl.IsMouseButtonPressed(button)
+    return snapshot.mouse_buttons.get(button, (False, False))
+
+def _gamepad_state(gamepad: int):
+    snapshot = __snapshot
+    state = snapshot.gamepads.get(gamepad) if snapshot is not None else None
+    if state is None:
+        __watched_buttons.setdefault(gamepad, set())
+        available = rl.IsGamepadAvailable(gamepad) if __replay is None else False
+        state = (available, {}, tuple(rl.GetGamepadAxisMovement(gamepad, axis) for axis in _GAMEPAD_AXES) if available else (0.,) * len(_GAMEPAD_AXES))
+        if snapshot is not None:
+            snapshot.gamepads[gamepad] = state
+    return state
+
+def _gamepad_button(gamepad: int, button: int) -> bool:
+    available, buttons, _ = _gamepad_state(gamepad)
+    down = buttons.get(button)
+    if down is None:
+        __watched_buttons.setdefault(gamepad, set()).add(button)
+        down = buttons[button] = (rl.IsGamepadButtonDown(gamepad, button), rl.IsGamepadButtonPressed(gamepad, button)) if available and __replay is None else (False, False)
+    return down[0]
+
 class Keyboard:
     """
     Handles input from keyboard
     """
     @classmethod
     def _fix_kname(cls, kname):
-        return getattr(rl, _fix_key(kname) if isinstance(kname, str) else kname)
+        return _key_code(kname)
 
     @classmethod
     def __getattr__(cls, kname: str | r.KeyboardKey | int):
-        return rl.IsKeyDown(getattr(rl, _fix_key(kname) if isinstance(kname, str) else kname))
+        return _key_state(_key_code(kname))[0]
 
     @classmethod
     def key_down(cls, kname: str | r.KeyboardKey | int):
         """
         Test if key is currently down
         """
-        return rl.IsKeyDown(cls._fix_kname(kname) if isinstance(kname, str) else kname)
+        return _key_state(_key_code(kname))[0]
 
     @classmethod
     def key_pressed(cls, kname: str | r.KeyboardKey | int):
         """
         Test if key was pressed recently
         """
-        return rl.IsKeyPressed(cls._fix_kname(kname) if isinstance(kname, str) else kname)
+        return _key_state(_key_code(kname))[1]
 
 class Gamepad:
     """
@@ -215,45 +593,49 @@ class Gamepad:
         if r.is_gamepad_available(self.id):
             print("Detected gamepad", self.id, rl.ffi.string(r.get_gamepad_name(self.id)))
 
+    @property
+    def available(self):
+        return _gamepad_state(self.id)[0]
+
     @property
     def up(self):
-        return r.is_gamepad_button_down(self.id, rl.GAMEPAD_BUTTON_LEFT_FACE_UP)
+        return _gamepad_button(self.id, rl.GAMEPAD_BUTTON_LEFT_FACE_UP)
 
     @property
     def down(self):
-        return r.is_gamepad_button_down(self.id, rl.GAMEPAD_BUTTON_LEFT_FACE_DOWN)
+        return _gamepad_button(self.id, rl.GAMEPAD_BUTTON_LEFT_FACE_DOWN)
 
     @property
     def left(self):
-        return r.is_gamepad_button_down(self.id, rl.GAMEPAD_BUTTON_LEFT_FACE_LEFT)
+        return _gamepad_button(self.id, rl.GAMEPAD_BUTTON_LEFT_FACE_LEFT)
 
     @property
     def right(self):
-        return r.is_gamepad_button_down(self.id, rl.GAMEPAD_BUTTON_LEFT_FACE_RIGHT)
+        return _gamepad_button(self.id, rl.GAMEPAD_BUTTON_LEFT_FACE_RIGHT)
 
     @property
     def y(self):
-        return r.is_gamepad_button_down(self.id, rl.GAMEPAD_BUTTON_RIGHT_FACE_UP)
+        return _gamepad_button(self.id, rl.GAMEPAD_BUTTON_RIGHT_FACE_UP)
 
     @property
     def a(self):
-        return r.is_gamepad_button_down(self.id, rl.GAMEPAD_BUTTON_RIGHT_FACE_DOWN)
+        return _gamepad_button(self.id, rl.GAMEPAD_BUTTON_RIGHT_FACE_DOWN)
 
     @property
     def x(self):
-        return r.is_gamepad_button_down(self.id, rl.GAMEPAD_BUTTON_RIGHT_FACE_LEFT)
+        return _gamepad_button(self.id, rl.GAMEPAD_BUTTON_RIGHT_FACE_LEFT)
 
     @property
     def b(self):
-        return r.is_gamepad_button_down(self.id, rl.GAMEPAD_BUTTON_RIGHT_FACE_RIGHT)
+        return _gamepad_button(self.id, rl.GAMEPAD_BUTTON_RIGHT_FACE_RIGHT)
 
     @property
     def left_stick(self):
-        return r.get_gamepad_axis_movement(self.id, rl.GAMEPAD_AXIS_LEFT_X), r.get_gamepad_axis_movement(self.id, rl.GAMEPAD_AXIS_LEFT_Y)
+        return _gamepad_state(self.id)[2][:2]
 
     @property
     def right_stick(self):
-        return r.get_gamepad_axis_movement(self.id, rl.GAMEPAD_AXIS_RIGHT_X), r.get_gamepad_axis_movement(self.id, rl.GAMEPAD_AXIS_RIGHT_Y)
+        return _gamepad_state(self.id)[2][2:]
 
 class Mouse:
     """
@@ -261,19 +643,33 @@ class Mouse:
     """
     @classmethod
     def left_button(cls):
-        return r.is_mouse_button_down(rl.MOUSE_BUTTON_LEFT)
+        return _mouse_state(rl.MOUSE_BUTTON_LEFT)[0]
 
     @classmethod
     def right_button(cls):
-        return r.is_mouse_button_down(rl.MOUSE_BUTTON_RIGHT)
+        return _mouse_state(rl.MOUSE_BUTTON_RIGHT)[0]
 
     @classmethod
     def middle_button(cls):
-        return r.is_mouse_button_down(rl.MOUSE_BUTTON_MIDDLE)
+        return _mouse_state(rl.MOUSE_BUTTON_MIDDLE)[0]
 
     @classmethod
     def clicked(cls):
-        return r.is_mouse_button_pressed(rl.MOUSE_BUTTON_LEFT)
+        return _mouse_state(rl.MOUSE_BUTTON_LEFT)[1]
+
+    @classmethod
+    def position(cls):
+        # module globals are looked up through input_snapshot, a dunder name here would be mangled
+        snapshot = input_snapshot()
+        if snapshot is None:
+            position = rl.GetMousePosition()
+            return position.x, position.y
+        return snapshot.mouse_position
+
+    @classmethod
+    def wheel(cls):
+        snapshot = input_snapshot()
+        return snapshot.mouse_wheel if snapshot is not None else rl.GetMouseWheelMove()
 
 def Color(_r: int | float, g: int | float, b: int | float, a: int | float = 255):
     return r.Color(*[x if isinstance(x, int) else int(x * 255.) for x in [_r, g, b, a]])
@@ -0,0 +1,355 @@
+# spritekit/render.py
+#
+# Copyright (C) 2025 George Watson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import raylib as rl
+import pyray as r
+from enum import IntEnum
+from contextlib import contextmanager
+from collections import Counter
+from time import perf_counter
+from typing import Optional
+
+__all__ = ["Command", "CommandBuffer", "Backend", "RaylibBackend", "NullBackend", "RecordingBackend",
+           "submit", "flush", "unload_after_flush", "command_buffer", "recording", "get_backend", "set_backend",
+           "RenderTarget", "get_render_target", "set_render_target", "render_scale", "render_camera"]
+
+class Command(IntEnum):
+    CLEAR = 0
+    BEGIN_2D = 1
+    END_2D = 2
+    LINE = 3
+    RECTANGLE = 4
+    RECTANGLE_LINES = 5
+    CIRCLE = 6
+    CIRCLE_LINES = 7
+    TRIANGLE = 8
+    TRIANGLE_LINES = 9
+    ELLIPSE = 10
+    ELLIPSE_LINES = 11
+    TEXTURE = 12
+    TEXT = 13
+    BEGIN_TEXTURE = 14
+    END_TEXTURE = 15
+
+# commands that change raylib state rather than emit geometry
+_MODE_COMMANDS = frozenset([Command.CLEAR, Command.BEGIN_2D, Command.END_2D, Command.BEGIN_TEXTURE, Command.END_TEXTURE])
+
+class CommandBuffer:
+    """
+    Draw commands in submission order, stored as parallel lists of opcodes and argument tuples
+    """
+    __slots__ = ("commands", "arguments")
+
+    def __init__(self):
+        self.commands = []
+        self.arguments = []
+
+    def push(self, command: Command, *args):
+        self.commands.append(command)
+        self.arguments.append(args)
+
+    def extend(self, other: "CommandBuffer"):
+        """
+        Append a retained buffer, e.g. commands recorded once for a static subtree
+        """
+        self.commands.extend(other.commands)
+        self.arguments.extend(other.arguments)
+
+    def clear(self):
+        self.commands.clear()
+        self.arguments.clear()
+
+    def replay(self, backend: Optional["Backend"] = None):
+        (backend or _backend).execute(self)
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __iter__(self):
+        return zip(self.commands, self.arguments)
+
+class Backend:
+    def execute(self, buffer: CommandBuffer):
+        raise NotImplementedError
+
+class RaylibBackend(Backend):
+    functions = {
+        Command.CLEAR: rl.ClearBackground,
+        Command.BEGIN_2D: rl.BeginMode2D,
+        Command.END_2D: rl.EndMode2D,
+        Command.LINE: rl.DrawLineEx,
+        Command.RECTANGLE: rl.DrawRectangleRec,
+        Command.RECTANGLE_LINES: rl.DrawRectangleLinesEx,
+        Command.CIRCLE: rl.DrawCircle,
+        Command.CIRCLE_LINES: rl.DrawCircleLines,
+        Command.TRIANGLE: rl.DrawTriangle,
+        Command.TRIANGLE_LINES: rl.DrawTriangleLines,
+        Command.ELLIPSE: rl.DrawEllipse,
+        Command.ELLIPSE_LINES: rl.DrawEllipseLines,
+        Command.TEXTURE: rl.DrawTexturePro,
+        Command.TEXT: rl.DrawTextPro,
+        Command.BEGIN_TEXTURE: rl.BeginTextureMode,
+        Command.END_TEXTURE: rl.EndTextureMode,
+    }
+
+    def execute(self, buffer: CommandBuffer):
+        functions = self.functions
+        for command, args in zip(buffer.commands, buffer.arguments):
+            functions[command](*args)
+
+class NullBackend(Backend):
+    """
+    Discards everything, for running scenes headless or timing the submission side alone
+    """
+    def execute(self, buffer: CommandBuffer):
+        pass
+
+def _texture_id(command, args):
+    if command == Command.TEXTURE:
+        return args[0].id
+    if command == Command.TEXT:
+        return args[0].texture.id
+    # shapes are drawn with raylib's internal white texture
+    return 0
+
+class RecordingBackend(Backend):
+    """
+    Counts draw calls per command and texture switches, optionally forwarding to another backend
+
+    With `timed` set, replaying into a RaylibBackend is timed per command, so the cost of actually
+    drawing shows up against the kind of command rather than only as one flush
+    """
+    def __init__(self, forward: Optional[Backend] = None, timed: bool = False):
+        self.forward = forward
+        self.timed = timed
+        self.reset()
+
+    def reset(self):
+        self.counts = Counter()
+        self.times = Counter()
+        self.replay_time = 0.
+        self.draw_calls = 0
+        self.texture_changes = 0
+        self.mode_changes = 0
+        self._texture = None
+
+    def execute(self, buffer: CommandBuffer):
+        for command, args in buffer:
+            self.counts[command] += 1
+            if command in _MODE_COMMANDS:
+                self.mode_changes += 1
+                # a mode change flushes raylib's batch just like a texture switch
+                self._texture = None
+                continue
+            self.draw_calls += 1
+            texture = _texture_id(command, args)
+            if texture != self._texture:
+                self.texture_changes += 1
+                self._texture = texture
+        if self.forward is None:
+            return
+        start = perf_counter()
+        if self.timed and isinstance(self.forward, RaylibBackend):
+            functions = self.forward.functions
+            times = self.times
+            for command, args in zip(buffer.commands, buffer.arguments):
+                t = perf_counter()
+                functions[command](*args)
+                times[command] += perf_counter() - t
+        else:
+            self.forward.execute(buffer)
+        self.replay_time += perf_counter() - start
+
+    def summary(self):
+        return {
+            "draw_calls": self.draw_calls,
+            "texture_changes": self.texture_changes,
+            "mode_changes": self.mode_changes,
+            "replay_ms": self.replay_time * 1000.,
+            "commands": {command.name: count for command, count in self.counts.items()}
+        }
+
+_buffer = CommandBuffer()
+_backend = RaylibBackend()
+_unload = []
+
+def submit(command: Command, *args):
+    _buffer.commands.append(command)
+    _buffer.arguments.append(args)
+
+def flush():
+    """
+    Replay everything submitted since the last flush through the current backend
+    """
+    _backend.execute(_buffer)
+    _buffer.clear()
+    for texture in _unload:
+        rl.UnloadTexture(texture)
+    _unload.clear()
+
+def unload_after_flush(texture):
+    """
+    Unload `texture` once the commands already submitted have been replayed, as they may still draw it
+    """
+    _unload.append(texture)
+
+def command_buffer() -> CommandBuffer:
+    return _buffer
+
+@contextmanager
+def recording(buffer: Optional[CommandBuffer] = None):
+    """
+    Redirect submitted commands into `buffer` instead of the frame, the buffer can be replayed or spliced in later
+    """
+    global _buffer
+    previous = _buffer
+    _buffer = buffer if buffer is not None else CommandBuffer()
+    try:
+        yield _buffer
+    finally:
+        _buffer = previous
+
+def get_backend() -> Backend:
+    return _backend
+
+def set_backend(backend: Backend) -> Backend:
+    """
+    Replace the backend used by `flush`, returns the previous one
+    """
+    global _backend
+    previous = _backend
+    _backend = backend
+    return previous
+
+class RenderTarget:
+    """
+    Offscreen canvas that scenes are drawn into at a fixed internal resolution, then scaled to fit the window
+
+    Scene layout stays in window coordinates, only the camera used for drawing is scaled, so the
+    resolution can be changed at any time without touching layout code
+
+    With more than one buffer each frame draws into the next texture in turn, so the frame read back
+    by `completed` was submitted a frame earlier than the one just drawn
+    """
+    def __init__(self,
+                 width: int,
+                 height: int,
+                 filter: int = rl.TEXTURE_FILTER_BILINEAR,
+                 letterbox: r.Color = r.BLACK,
+                 buffers: int = 1):
+        self.width = int(width)
+        self.height = int(height)
+        self.filter = filter
+        self.letterbox = letterbox
+        self.buffers = max(1, buffers)
+        # frames drawn since the textures were last created
+        self.frames = 0
+        self._textures = []
+        self._index = 0
+        self._texture = None
+
+    def resize(self, width: int, height: int):
+        """
+        Change the internal resolution, the texture is recreated at the start of the next frame
+        """
+        if (int(width), int(height)) != (self.width, self.height):
+            self.width = int(width)
+            self.height = int(height)
+            self.unload()
+
+    def begin(self):
+        if not self._textures:
+            for _ in range(self.buffers):
+                texture = rl.LoadRenderTexture(self.width, self.height)
+                rl.SetTextureFilter(texture.texture, self.filter)
+                self._textures.append(texture)
+            self._index = -1
+            self.frames = 0
+        self._index = (self._index + 1) % len(self._textures)
+        self._texture = self._textures[self._index]
+        self.frames += 1
+        submit(Command.BEGIN_TEXTURE, self._texture)
+
+    def completed(self):
+        """
+        The oldest frame still held, with double buffering the one before the frame just submitted
+        """
+        # nothing held before the first frame or after a resize until `begin` recreates the textures
+        if not self._textures or self.frames < len(self._textures):
+            return None
+        return self._textures[(self._index + 1) % len(self._textures)]
+
+    def present(self):
+        """
+        Leave texture mode and draw the canvas to the window, letterboxed to keep its aspect ratio
+        """
+        submit(Command.END_TEXTURE)
+        sw, sh = rl.GetScreenWidth(), rl.GetScreenHeight()
+        scale = min(sw / self.width, sh / self.height)
+        w, h = self.width * scale, self.height * scale
+        submit(Command.CLEAR, self.letterbox)
+        # render textures are stored upside down, a negative source height flips them back
+        submit(Command.TEXTURE, self._texture.texture, (0, 0, self.width, -self.height),
+               ((sw - w) / 2, (sh - h) / 2, w, h), (0, 0), 0., r.WHITE)
+
+    def unload(self):
+        for texture in self._textures:
+            rl.UnloadRenderTexture(texture)
+        self._textures.clear()
+        self._texture = None
+        self.frames = 0
+
+_target = None
+
+def get_render_target() -> Optional[RenderTarget]:
+    return _target
+
+def set_render_target(target: Optional[RenderTarget]) -> Optional[RenderTarget]:
+    """
+    Draw scenes into `target` from the next frame, None draws straight to the window again
+    """
+    global _target
+    previous = _target
+    _target = target
+    if previous is not None and previous is not target:
+        previous.unload()
+    return previous
+
+def render_scale() -> float:
+    """
+    Factor from window coordinates to the render target, 1 when drawing straight to the window
+    """
+    sw, sh = rl.GetScreenWidth(), rl.GetScreenHeight()
+    if _target is None or not sw or not sh:
+        return 1.
+    return min(_target.width / sw, _target.height / sh)
+
+def render_camera(camera: r.Camera2D) -> r.Camera2D:
+    """
+    `camera` adjusted to draw into the current render target, centred if the aspect ratios differ
+    """
+    sw, sh = rl.GetScreenWidth(), rl.GetScreenHeight()
+    # a scale of 1 can still need padding, e.g. a wider target than the window at the same height
+    if _target is None or not sw or not sh or (_target.width, _target.height) == (sw, sh):
+        return camera
+    scale = render_scale()
+    pad_x = (_target.width - sw * scale) / 2
+    pad_y = (_target.height - sh * scale) / 2
+    return r.Camera2D((camera.offset.x * scale + pad_x, camera.offset.y * scale + pad_y),
+                      (camera.target.x, camera.target.y),
+                      camera.rotation,
+                      camera.zoom * scale)
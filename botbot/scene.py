@@ -15,19 +15,65 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from .actor import ActorType, ActorParent
+from .actor import ActorType, ActorParent, Actor, Actor2D
+from .spatial import SpatialGrid
+from .render import Command, submit, flush, get_render_target, render_camera
+from .animation import Animator, animator
 import pyray as r
 import atexit
 from typing import Optional, override
 from dataclasses import dataclass, field
 from enum import Enum
-import transitions
+from importlib import import_module
 
-__all__ = ["Scene", "Transition", "FiniteStateMachine"]
+__all__ = ["Scene", "Transition", "FiniteStateMachine", "StateMachine", "MachineError",
+           "register_scene", "lazy_scene", "find_scene"]
 
-__scene__ = []
-__next_scene = None
-__drop_scene = None
+_scenes = []
+_pending = []
+_registry = {}
+_lazy_registry = {}
+_entry_points_loaded = False
+
+def _draw_key(entry):
+    actor, z, _ = entry
+    return z, actor._sort_y() if getattr(actor, "y_sort", False) else 0., actor._texture_id()
+
+def register_scene(cls=None, *, name: Optional[str] = None):
+    """
+    Class decorator that makes a Scene selectable by name, defaults to the class name
+    """
+    def decorator(cls):
+        _registry[name or cls.__name__] = cls
+        return cls
+    return decorator(cls) if cls is not None else decorator
+
+def lazy_scene(name: str, module: str):
+    """
+    Declare that scene `name` is registered by `module`, which is only imported the first time it is needed
+    """
+    _lazy_registry[name] = module
+
+def _load_entry_points():
+    global _entry_points_loaded
+    _entry_points_loaded = True
+    from importlib.metadata import entry_points
+    for ep in entry_points(group="botbot.scenes"):
+        _lazy_registry.setdefault(ep.name, ep.module)
+
+def find_scene(name: str):
+    """
+    Look up a registered Scene class, importing its module on first use
+    """
+    if name in _registry:
+        return _registry[name]
+    if name not in _lazy_registry and not _entry_points_loaded:
+        _load_entry_points()
+    if name in _lazy_registry:
+        import_module(_lazy_registry[name])
+        if name in _registry:
+            return _registry[name]
+    raise ValueError(f"Scene `{name}` not found")
 
 @dataclass
 class Transition:
@@ -46,18 +92,115 @@ class Transition:
         transition_args.update(**self.kwargs)  # unpack kwargs
         return transition_args
 
+class MachineError(Exception):
+    pass
+
+def _callbacks(value: Optional[str | list[str]]) -> tuple:
+    if value is None:
+        return ()
+    return tuple(value) if isinstance(value, (list, tuple)) else (value,)
+
+def _call(model, callback, args, kwargs):
+    return (getattr(model, callback) if isinstance(callback, str) else callback)(*args, **kwargs)
+
+@dataclass(frozen=True, slots=True)
+class _CompiledTransition:
+    dest: str | Enum
+    prepare: tuple
+    conditions: tuple
+    unless: tuple
+    before: tuple
+    after: tuple
+
+def _trigger_method(trigger: str):
+    def trigger_event(self, *args, **kwargs):
+        return self.fsm.trigger(trigger, *args, **kwargs)
+    trigger_event.__name__ = trigger
+    return trigger_event
+
+class StateMachine:
+    """
+    Per-instance handle onto the transition table compiled once for its class
+    """
+    __slots__ = ("model", "table", "states", "ignore_invalid_triggers")
+
+    def __init__(self, model, table: dict, states: list, initial, ignore_invalid_triggers: bool = False):
+        self.model = model
+        self.table = table
+        self.states = states
+        self.ignore_invalid_triggers = ignore_invalid_triggers
+        self.set_state(initial)
+
+    @property
+    def state(self):
+        return self.model.state
+
+    def set_state(self, state):
+        if state not in self.states:
+            raise ValueError(f"State `{state}` is not a registered state")
+        self.model.state = state
+
+    def get_triggers(self, state) -> list[str]:
+        return [trigger for trigger, sources in self.table.items() if state in sources]
+
+    def trigger(self, trigger: str, *args, **kwargs) -> bool:
+        model = self.model
+        transitions = self.table[trigger].get(model.state)
+        if transitions is None:
+            if self.ignore_invalid_triggers:
+                return False
+            raise MachineError(f"Can't trigger event {trigger} from state {model.state}!")
+        for t in transitions:
+            for callback in t.prepare:
+                _call(model, callback, args, kwargs)
+            if not all(_call(model, c, args, kwargs) for c in t.conditions):
+                continue
+            if any(_call(model, c, args, kwargs) for c in t.unless):
+                continue
+            for callback in t.before:
+                _call(model, callback, args, kwargs)
+            model.state = t.dest
+            for callback in t.after:
+                _call(model, callback, args, kwargs)
+            return True
+        return False
+
 class FiniteStateMachine:
     states: list[str] = []
     transitions: list[dict | Transition] = []
 
-    def __init__(self, **kwargs):
+    @classmethod
+    def _compile(cls) -> dict:
+        """
+        Build the trigger -> source state -> transitions table once per class and bind the trigger methods
+        """
+        if "_fsm_table" in cls.__dict__:
+            return cls._fsm_table
+        table = {}
+        for t in cls.transitions:
+            t = t.explode() if isinstance(t, Transition) else dict(t)
+            source = t["source"]
+            sources = cls.states if source == "*" else source if isinstance(source, list) else [source]
+            for state in sources:
+                compiled = _CompiledTransition(dest=state if t["dest"] == "=" else t["dest"],
+                                               prepare=_callbacks(t.get("prepare")),
+                                               conditions=_callbacks(t.get("conditions")),
+                                               unless=_callbacks(t.get("unless")),
+                                               before=_callbacks(t.get("before")),
+                                               after=_callbacks(t.get("after")))
+                table.setdefault(t["trigger"], {}).setdefault(state, []).append(compiled)
+            if not hasattr(cls, t["trigger"]):
+                setattr(cls, t["trigger"], _trigger_method(t["trigger"]))
+        cls._fsm_table = table
+        return table
+
+    def __init__(self, initial=None, ignore_invalid_triggers: bool = False):
         if self.__class__.states:
-            if not "initial" in kwargs:
-                kwargs["initial"] = self.__class__.states[0]
-            self.fsm = transitions.Machine(model=self,
-                                           states=self.__class__.states,
-                                           transitions=[t.explode() if isinstance(t, Transition) else t for t in self.__class__.transitions],
-                                           **kwargs)
+            self.fsm = StateMachine(self,
+                                    self.__class__._compile(),
+                                    self.__class__.states,
+                                    self.__class__.states[0] if initial is None else initial,
+                                    ignore_invalid_triggers)
         else:
             self.fsm = None
 
@@ -72,6 +215,13 @@ class Scene(FiniteStateMachine, ActorParent):
         self.camera.zoom = 1.
         self.clear_color = r.RAYWHITE
         self.run_in_background = False
+        self._entered = False
+        self._grid = None
+        self.render_queue = False
+        self._queue = []
+        self._queue_ids = None
+        # sprite animations of this scene, only advanced while the scene itself is stepped
+        self.animator = Animator()
         self.assets = {} # TODO: Store and restore assets to __cache in raylib.py
 
     @override
@@ -79,9 +229,58 @@ class Scene(FiniteStateMachine, ActorParent):
         if node:
             node.__dict__["scene"] = self
             self._add_child(node)
+            if self._grid is not None:
+                self._grid.insert(node)
         else:
             raise RuntimeError("Invalid Node")
 
+    @override
+    def remove_child(self, child: Optional[str | ActorType] = None):
+        if self._grid is not None and not isinstance(child, str):
+            self._grid.remove(child)
+        super().remove_child(child)
+
+    @override
+    def remove_children(self, name: Optional[str] = ""):
+        if self._grid is not None:
+            for child in self.find_children(name):
+                self._grid.remove(child)
+        super().remove_children(name)
+
+    @override
+    def remove_all_children(self):
+        if self._grid is not None:
+            self._grid.clear()
+        super().remove_all_children()
+
+    @property
+    def culling(self):
+        """
+        Only draw children that intersect the camera view, tracked through a SpatialGrid
+        Children marked `static` are indexed once, the rest are re-bucketed after every step
+        """
+        return self._grid is not None
+
+    @culling.setter
+    def culling(self, value: bool):
+        if value == self.culling:
+            return
+        if value:
+            self._grid = SpatialGrid()
+            for child in reversed(self.all_children()):
+                self._grid.insert(child)
+        else:
+            self._grid = None
+
+    def view(self):
+        """
+        Rectangle of the world currently visible through the camera
+        """
+        zoom = self.camera.zoom or 1.
+        x = self.camera.target.x - self.camera.offset.x / zoom
+        y = self.camera.target.y - self.camera.offset.y / zoom
+        return x, y, self.width / zoom, self.height / zoom
+
     def enter(self):
         pass
 
@@ -95,58 +294,176 @@ class Scene(FiniteStateMachine, ActorParent):
         pass
 
     def step(self, delta):
+        self.animator.step(delta)
         for child in reversed(self.all_children()):
             child.step(delta)
+        if self._grid is not None:
+            self._grid.update()
 
     def step_background(self, delta):
         if self.run_in_background:
             self.step(delta)
 
+    def _collect(self, actors, entries, z):
+        for actor in actors:
+            # plain containers draw nothing themselves, so their children are queued individually
+            if not isinstance(actor, Actor2D) and type(actor).draw is Actor.draw:
+                self._collect(reversed(actor.all_children()), entries, z + actor.z)
+            else:
+                entries.append((actor, z + actor.z, len(entries)))
+
+    def _draw_queue(self, children):
+        """
+        Children ordered by layer, then screen y for `y_sort` actors, then texture so raylib can batch
+        consecutive sprites, last frame's order is the starting point so an unchanged scene sorts in one pass
+        """
+        entries = []
+        self._collect(children, entries, 0.)
+        ids = [id(entry[0]) for entry in entries]
+        if ids == self._queue_ids:
+            entries = [entries[entry[2]] for entry in self._queue]
+        else:
+            self._queue_ids = ids
+        entries.sort(key=_draw_key)
+        self._queue = entries
+        return [entry[0] for entry in entries]
+
     def draw(self):
-        r.clear_background(self.clear_color)
-        r.begin_mode_2d(self.camera)
-        for child in reversed(self.all_children()):
+        if self.clear_color is not None:
+            submit(Command.CLEAR, self.clear_color)
+        submit(Command.BEGIN_2D, render_camera(self.camera))
+        if self._grid is not None and not self.camera.rotation:
+            children = self._grid.query(self.view())
+        else:
+            children = reversed(self.all_children())
+        if self.render_queue:
+            children = self._draw_queue(children)
+        for child in children:
             child.draw()
-        r.end_mode_2d()
+        submit(Command.END_2D)
 
     def draw_background(self):
         if self.run_in_background:
             self.draw()
 
+    @property
+    def entered(self):
+        return self._entered
+
+    def activate(self):
+        """
+        Make this scene the active one, `enter` the first time and `reenter` once it is warm
+        """
+        if self._entered:
+            self.reenter()
+        else:
+            self._entered = True
+            self.enter()
+
     @classmethod
     def push_scene(cls, scene):
+        """
+        Queue `scene` on top of the stack, the scene below is suspended but keeps its actors and assets
+        """
         if not isinstance(scene, Scene):
             raise RuntimeError("Invalid Scene")
-        global __next_scene
-        if __next_scene is not None:
-            raise RuntimeError("Next scene already queued")
-        __next_scene = scene
+        _pending.append(("push", scene))
+
+    @classmethod
+    def replace_scene(cls, scene):
+        """
+        Queue `scene` in place of the current scene, which is suspended rather than exited
+        """
+        if not isinstance(scene, Scene):
+            raise RuntimeError("Invalid Scene")
+        _pending.append(("replace", scene))
 
     @classmethod
     def drop_scene(cls):
-        global __scene__, __drop_scene
-        if __drop_scene is not None:
-            raise RuntimeError("Drop scene already queued")
-        __drop_scene = __scene__[-1:]
+        _pending.append(("drop", None))
 
     @classmethod
     def first_scene(cls):
-        global __scene__, __drop_scene
-        __drop_scene = __scene__[1:]
+        _pending.append(("first", None))
+
+    @classmethod
+    def update_scenes(cls):
+        """
+        Apply queued stack changes, called between frames so nothing is removed mid-step
+        """
+        while _pending:
+            op, scene = _pending.pop(0)
+            match op:
+                case "push":
+                    if _scenes:
+                        _scenes[-1].background()
+                    if scene in _scenes:
+                        _scenes.remove(scene)
+                    _scenes.append(scene)
+                    scene.activate()
+                case "replace":
+                    if _scenes:
+                        _scenes.pop().background()
+                    if scene in _scenes:
+                        _scenes.remove(scene)
+                    _scenes.append(scene)
+                    scene.activate()
+                case "drop":
+                    if _scenes:
+                        _scenes.pop().exit()
+                    if _scenes:
+                        _scenes[-1].activate()
+                case "first":
+                    while len(_scenes) > 1:
+                        _scenes.pop().exit()
+                    if _scenes:
+                        _scenes[0].activate()
+
+    @classmethod
+    def current_animator(cls) -> Animator:
+        """
+        Animator of the scene on top of the stack, or the shared one for sprites outside any scene
+        """
+        return _scenes[-1].animator if _scenes else animator
+
+    @classmethod
+    def step_scenes(cls, delta):
+        # the shared animator is for sprites that don't belong to a scene
+        animator.step(delta)
+        for scene in _scenes[:-1]:
+            scene.step_background(delta)
+        if _scenes:
+            _scenes[-1].step(delta)
+
+    @classmethod
+    def draw_scenes(cls):
+        target = get_render_target()
+        if target is not None:
+            target.begin()
+        for scene in _scenes[:-1]:
+            scene.draw_background()
+        if _scenes:
+            _scenes[-1].draw()
+        if target is not None:
+            target.present()
+        flush()
+
+    @classmethod
+    def scene_stack(cls):
+        return list(_scenes)
 
     @classmethod
     def current_scene(cls):
-        if not __scene__:
+        if not _scenes:
             raise RuntimeError("No active Scene")
-        return __scene__[-1]
+        return _scenes[-1]
 
     @classmethod
     def main_scene(cls):
-        global __next_scene
-        if __next_scene is None:
-            raise RuntimeError("No next scene queued")
-        return __scene__[0]
-    
+        if not _scenes:
+            raise RuntimeError("No active Scene")
+        return _scenes[0]
+
     @property
     def width(self):
         return r.get_screen_width()
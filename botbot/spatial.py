@@ -0,0 +1,139 @@
+# spritekit/spatial.py
+#
+# Copyright (C) 2025 George Watson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from .actor import ActorType
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Optional
+
+__all__ = ["SpatialGrid"]
+
+@dataclass
+class _Entry:
+    actor: ActorType
+    order: int
+    bounds: Optional[tuple] = None
+    cells: tuple = ()
+
+class SpatialGrid:
+    """
+    Uniform grid over actor bounds, used to find what is inside the camera view
+    Actors are keyed by identity as dataclass actors are not hashable
+    """
+    def __init__(self, cell_size: float = 256.):
+        self.cell_size = cell_size
+        self._order = count()
+        self._entries = {}
+        self._cells = {}
+        self._unbounded = {}
+        self._dynamic = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, actor: ActorType):
+        return id(actor) in self._entries
+
+    def _cell_range(self, bounds):
+        x, y, w, h = bounds
+        cs = self.cell_size
+        return int(x // cs), int(y // cs), int((x + w) // cs), int((y + h) // cs)
+
+    def _place(self, entry: _Entry, bounds):
+        key = id(entry.actor)
+        cells = self._cell_range(bounds) if bounds is not None else ()
+        entry.bounds = bounds
+        if cells == entry.cells:
+            return
+        self._unplace(entry)
+        entry.cells = cells
+        if not cells:
+            self._unbounded[key] = entry
+            return
+        x0, y0, x1, y1 = cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self._cells.setdefault((cx, cy), {})[key] = entry
+
+    def _unplace(self, entry: _Entry):
+        key = id(entry.actor)
+        if not entry.cells:
+            self._unbounded.pop(key, None)
+            return
+        x0, y0, x1, y1 = entry.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self._cells.get((cx, cy))
+                if cell is not None:
+                    cell.pop(key, None)
+                    if not cell:
+                        del self._cells[(cx, cy)]
+
+    def insert(self, actor: ActorType):
+        key = id(actor)
+        if key in self._entries:
+            return
+        entry = _Entry(actor, next(self._order), cells=None)
+        self._entries[key] = entry
+        if not getattr(actor, "static", False):
+            self._dynamic[key] = entry
+        self._place(entry, actor.bounds())
+
+    def remove(self, actor: ActorType):
+        entry = self._entries.pop(id(actor), None)
+        if entry is not None:
+            self._dynamic.pop(id(actor), None)
+            self._unplace(entry)
+
+    def clear(self):
+        self._entries.clear()
+        self._cells.clear()
+        self._unbounded.clear()
+        self._dynamic.clear()
+
+    def update(self, actor: Optional[ActorType] = None):
+        """
+        Re-bucket one actor, or every non-static actor when none is given
+        Only actors whose bounds moved into different cells touch the grid
+        """
+        if actor is not None:
+            entry = self._entries.get(id(actor))
+            if entry is not None:
+                self._place(entry, actor.bounds())
+            return
+        for entry in self._dynamic.values():
+            self._place(entry, entry.actor.bounds())
+
+    def query(self, view: tuple[float, float, float, float]):
+        """
+        Actors whose bounds intersect `view`, plus every actor without bounds, in insertion order
+        """
+        vx, vy, vw, vh = view
+        x0, y0, x1, y1 = self._cell_range(view)
+        found = dict(self._unbounded)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._cells):
+            cells = [cell for (cx, cy), cell in self._cells.items() if x0 <= cx <= x1 and y0 <= cy <= y1]
+        else:
+            cells = [self._cells[c] for c in ((cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)) if c in self._cells]
+        for cell in cells:
+            for key, entry in cell.items():
+                if key in found:
+                    continue
+                x, y, w, h = entry.bounds
+                if x <= vx + vw and x + w >= vx and y <= vy + vh and y + h >= vy:
+                    found[key] = entry
+        return [entry.actor for entry in sorted(found.values(), key=lambda e: e.order)]
@@ -0,0 +1,122 @@
+# spritekit/telemetry.py
+#
+# Copyright (C) 2025 George Watson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from math import log, ceil
+from time import perf_counter
+from typing import Optional
+import json
+
+__all__ = ["Histogram", "FrameTelemetry"]
+
+class Histogram:
+    """
+    Fixed memory histogram with logarithmic buckets, values are in seconds
+    Each bucket is `growth` times wider than the last, so percentiles are accurate to that ratio
+    """
+    def __init__(self, low: float = 1e-5, high: float = 10., growth: float = 1.05):
+        self.low = low
+        self.growth = growth
+        self._log_growth = log(growth)
+        self._buckets = [0] * (ceil(log(high / low) / self._log_growth) + 1)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, value: float):
+        if value <= self.low:
+            i = 0
+        else:
+            i = min(int(log(value / self.low) / self._log_growth) + 1, len(self._buckets) - 1)
+        self._buckets[i] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p: float):
+        if not self.count:
+            return 0.
+        rank = p / 100. * self.count
+        seen = 0
+        for i, n in enumerate(self._buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(self.low * self.growth ** i, self.max)
+        return self.max
+
+    def reset(self):
+        self._buckets = [0] * len(self._buckets)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def summary(self):
+        """
+        Count, mean, p50/p95/p99 and max in milliseconds
+        """
+        return {"count": self.count,
+                "mean_ms": (self.total / self.count if self.count else 0.) * 1000.,
+                "p50_ms": self.percentile(50) * 1000.,
+                "p95_ms": self.percentile(95) * 1000.,
+                "p99_ms": self.percentile(99) * 1000.,
+                "max_ms": self.max * 1000.}
+
+class FrameTelemetry:
+    """
+    Records every frame's step, draw and present time into histograms split by scene and state
+    When `interval` is set a summary is dumped every `interval` seconds, to `output` or stdout
+    """
+    phases = ("step", "draw", "present", "frame")
+
+    def __init__(self, output: Optional[str] = None, interval: Optional[float] = None):
+        self.interval = interval
+        self._output = output
+        self._histograms = {}
+        self._last_dump = perf_counter()
+
+    def _histogram(self, scene: str, state: str, phase: str):
+        key = scene, state, phase
+        if key not in self._histograms:
+            self._histograms[key] = Histogram()
+        return self._histograms[key]
+
+    def record(self, scene: str, state: Optional[str], step: float, draw: float, present: float):
+        state = state or "-"
+        for phase, value in zip(self.phases, (step, draw, present, step + draw + present)):
+            self._histogram(scene, state, phase).add(value)
+        if self.interval and perf_counter() - self._last_dump >= self.interval:
+            self.dump()
+
+    def report(self):
+        report = {}
+        for (scene, state, phase), histogram in self._histograms.items():
+            report.setdefault(scene, {}).setdefault(state, {})[phase] = histogram.summary()
+        return report
+
+    def dump(self):
+        """
+        Write the current report, then reset so each dump covers one interval
+        """
+        self._last_dump = perf_counter()
+        line = json.dumps(self.report())
+        if self._output:
+            with open(self._output, "a") as f:
+                f.write(line + "\n")
+        else:
+            print(line)
+        for histogram in self._histograms.values():
+            histogram.reset()
@@ -0,0 +1,267 @@
+# spritekit/timeline.py
+#
+# Copyright (C) 2025 George Watson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from .actor import Actor
+from .easing import ease_linear_in_out
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from math import inf
+from typing import Optional, Callable, Any
+
+__all__ = ["Track", "Tween", "Wait", "Call", "Sequence", "Parallel", "Repeat", "TimelineNode"]
+
+class Track:
+    """
+    Something that can be put into the state it has at local time `t`
+
+    Tracks are evaluated from absolute time rather than accumulated deltas, `previous` is the
+    time of the last evaluation (-inf before the first) so tracks can tell what was crossed
+    """
+    duration: float = 0.
+
+    def apply(self, t: float, previous: float):
+        raise NotImplementedError
+
+class Tween(Track):
+    def __init__(self,
+                 actor: Any,
+                 field: str | list[str],
+                 target: Any,
+                 duration: float = 1.,
+                 easing: Callable[[float, float, float, float], float] = ease_linear_in_out,
+                 start: Any = None):
+        self.actor = actor
+        self.field = field if isinstance(field, list) else field.split(".")
+        self.target = target
+        self.duration = duration
+        self.easing = easing
+        self.start = start
+
+    def _owner(self):
+        obj = self.actor
+        for name in self.field[:-1]:
+            obj = getattr(obj, name)
+        return obj
+
+    def apply(self, t: float, previous: float):
+        owner = self._owner() if len(self.field) > 1 else self.actor
+        if self.start is None:
+            # captured on first evaluation so chained tweens start where the last one left off
+            self.start = getattr(owner, self.field[-1])
+        if t < 0.:
+            t = 0.
+        elif t > self.duration:
+            t = self.duration
+        if isinstance(self.start, (int, float)):
+            if self.duration:
+                value = self.easing(t, self.start, self.target - self.start, self.duration)
+            else:
+                value = self.target
+            setattr(owner, self.field[-1], type(self.start)(value))
+        else:
+            if self.duration:
+                value = [self.easing(t, a, b - a, self.duration) for a, b in zip(self.start, self.target)]
+            else:
+                value = list(self.target)
+            setattr(owner, self.field[-1], value)
+        if owner is not self.actor and self.field[0] in getattr(self.actor, "_transform_fields", ()):
+            # writing through a sub-object like `position.x` bypasses __setattr__ on the actor
+            self.actor.mark_dirty()
+
+class Wait(Track):
+    def __init__(self, duration: float):
+        self.duration = duration
+
+    def apply(self, t: float, previous: float):
+        pass
+
+class Call(Track):
+    """
+    Calls `func` whenever the playhead moves forward across it
+    """
+    def __init__(self, func: Callable[[], None]):
+        self.func = func
+
+    def apply(self, t: float, previous: float):
+        if previous < 0. <= t:
+            self.func()
+
+class _Group(Track):
+    def __init__(self, tracks: list[Track]):
+        self.tracks = tracks
+
+    def _apply_children(self, indices, t, previous, offsets):
+        # walking backwards unwinds later tracks first so earlier ones on the same field win
+        if t < previous:
+            indices = reversed(indices)
+        for i in indices:
+            self.tracks[i].apply(t - offsets[i], previous - offsets[i])
+
+class Sequence(_Group):
+    """
+    Tracks played one after another, the ones touched by a step are found by bisecting their start and end times
+    """
+    def __init__(self, tracks: list[Track]):
+        super().__init__(tracks)
+        self._ends = list(accumulate(track.duration for track in tracks))
+        self._starts = [0.] + self._ends[:-1]
+        self.duration = self._ends[-1] if tracks else 0.
+
+    def apply(self, t: float, previous: float):
+        lo, hi = (previous, t) if previous < t else (t, previous)
+        first = bisect_left(self._ends, lo)
+        last = bisect_right(self._starts, hi)
+        if last - first == 1:
+            # the common case, the playhead stayed inside one track
+            offset = self._starts[first]
+            self.tracks[first].apply(t - offset, previous - offset)
+        else:
+            self._apply_children(range(first, last), t, previous, self._starts)
+
+class Parallel(_Group):
+    """
+    Tracks that all start together, the group lasts as long as the longest one
+    """
+    def __init__(self, tracks: list[Track]):
+        super().__init__(tracks)
+        self.duration = max((track.duration for track in tracks), default=0.)
+        self._offsets = [0.] * len(tracks)
+
+    def apply(self, t: float, previous: float):
+        lo = min(t, previous)
+        # tracks that already finished before this step are left at their end state
+        indices = [i for i, track in enumerate(self.tracks) if track.duration >= lo]
+        self._apply_children(indices, t, previous, self._offsets)
+
+class Repeat(Track):
+    """
+    Plays `track` `count` times (forever when None), every other cycle in reverse when `yoyo` is set
+    """
+    def __init__(self, track: Track, count: Optional[int] = None, yoyo: bool = False):
+        self.track = track
+        self.count = count
+        self.yoyo = yoyo
+        self.duration = inf if count is None else track.duration * count
+
+    def _local(self, cycle: int, offset: float):
+        if self.yoyo and cycle % 2:
+            return self.track.duration - offset
+        return offset
+
+    def _cycle(self, t: float):
+        cycle = int(t // self.track.duration)
+        if self.count is not None:
+            cycle = min(cycle, self.count - 1)
+        return cycle, self._local(cycle, t - cycle * self.track.duration)
+
+    def apply(self, t: float, previous: float):
+        d = self.track.duration
+        if not d:
+            self.track.apply(t, previous)
+            return
+        t = min(max(t, 0.), self.duration)
+        cycle, local = self._cycle(t)
+        if previous < 0.:
+            pcycle, plocal = 0, previous
+        else:
+            pcycle, plocal = self._cycle(min(previous, self.duration))
+        if cycle == pcycle:
+            self.track.apply(local, plocal)
+            return
+        # finish the cycle being left, then enter the new one as if from outside the edge the playhead came through
+        forward = cycle > pcycle
+        self.track.apply(self._local(pcycle, d if forward else 0.), plocal)
+        self.track.apply(local, -inf if self._local(cycle, 0. if forward else d) == 0. else inf)
+
+class TimelineNode(Actor):
+    """
+    Plays a track against its own clock, can be paused, scrubbed with `seek` or fast-forwarded
+
+    `repeat` plays the track that many times, forever when True. `yoyo` plays every other cycle in
+    reverse, on its own that is a single there-and-back, combine it with `repeat` to ping-pong
+    """
+    def __init__(self,
+                 track: Track,
+                 speed: float = 1.,
+                 repeat: Optional[bool | int] = None,
+                 yoyo: bool = False,
+                 auto_start: bool = True,
+                 remove_on_complete: bool = True,
+                 on_complete: Optional[Callable[[], None]] = None,
+                 **kwargs):
+        super().__init__(**kwargs)
+        if repeat is True:
+            track = Repeat(track, None, yoyo)
+        elif repeat or yoyo:
+            track = Repeat(track, int(repeat) if repeat else 2, yoyo)
+        self.track = track
+        self.speed = speed
+        self.remove_on_complete = remove_on_complete
+        self.on_complete = on_complete
+        self.time = 0.
+        self._previous = -inf
+        self._running = auto_start
+        self._completed = False
+
+    @property
+    def duration(self):
+        return self.track.duration
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def completed(self):
+        return self._completed
+
+    def seek(self, time: float):
+        """
+        Put every track into its state at `time`, skipping whole tracks the playhead did not touch
+        """
+        duration = self.track.duration
+        self.time = time = 0. if time < 0. else duration if time > duration else time
+        self.track.apply(time, self._previous)
+        self._previous = time
+        if time >= duration and not self._completed:
+            self._completed = True
+            self._running = False
+            if self.on_complete:
+                self.on_complete()
+            if self.remove_on_complete:
+                self.remove_me()
+        elif time < duration:
+            self._completed = False
+
+    def fast_forward(self, delta: float):
+        self.seek(self.time + delta)
+
+    def step(self, delta: float):
+        if self._running:
+            self.seek(self.time + delta * self.speed)
+        super().step(delta)
+
+    def play(self):
+        self._running = not self._completed
+
+    def pause(self):
+        self._running = False
+
+    def restart(self):
+        self._completed = False
+        self._running = True
+        self.seek(0.)
@@ -0,0 +1,51 @@
+import unittest
+from botbot.pool import BettingPool, PoolClosedError
+
+class BettingPoolTest(unittest.TestCase):
+    def test_odds_from_totals(self):
+        pool = BettingPool(3, takeout=.1)
+        pool.bet(0, 100)
+        pool.bet(1, 300)
+        # 400 staked, 360 paid back to the winners
+        self.assertAlmostEqual(pool.odds(0), 2.6)
+        self.assertAlmostEqual(pool.odds(1), .2)
+        self.assertIsNone(pool.odds(2))
+        self.assertAlmostEqual(pool.payout(0, 10), 36.)
+
+    def test_minimum_odds(self):
+        pool = BettingPool(2, takeout=.15, minimum=.05)
+        pool.bet(0, 100)
+        self.assertEqual(pool.odds(0), .05)
+
+    def test_publish_only_reports_changes(self):
+        pool = BettingPool(3)
+        self.assertEqual(pool.publish(), [])
+        pool.bet(0, 100)
+        pool.bet(1, 300)
+        self.assertEqual(pool.publish(), [(0, "2.4/1"), (1, "0.1/1")])
+        # too small to move the rounded odds
+        pool.bet(1, 1)
+        self.assertEqual(pool.publish(), [])
+        pool.bet(0, 100)
+        self.assertEqual(pool.publish(), [(0, "1.1/1"), (1, "0.4/1")])
+
+    def test_rejects_unknown_outcomes(self):
+        pool = BettingPool(8)
+        for outcome in (-1, 8):
+            with self.assertRaises(ValueError):
+                pool.bet(outcome, 5)
+        self.assertEqual(pool.total, 0)
+
+    def test_rejects_bad_amounts(self):
+        pool = BettingPool(2)
+        with self.assertRaises(ValueError):
+            pool.bet(0, 0)
+
+    def test_closed(self):
+        pool = BettingPool(2)
+        pool.close()
+        with self.assertRaises(PoolClosedError):
+            pool.bet(0, 5)
+
+if __name__ == "__main__":
+    unittest.main()
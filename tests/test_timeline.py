@@ -0,0 +1,43 @@
+import unittest
+from math import inf
+from botbot.timeline import TimelineNode, Tween
+
+class Box:
+    x = 0.
+
+def _linear(t, b, c, d):
+    return b + c * t / d
+
+class YoyoTest(unittest.TestCase):
+    def test_yoyo_alone_is_one_there_and_back(self):
+        box = Box()
+        timeline = TimelineNode(Tween(box, "x", 10., duration=1., easing=_linear), yoyo=True, remove_on_complete=False)
+        self.assertEqual(timeline.duration, 2.)
+        timeline.step(1.)
+        self.assertAlmostEqual(box.x, 10.)
+        timeline.step(.5)
+        self.assertAlmostEqual(box.x, 5.)
+        timeline.step(.5)
+        self.assertAlmostEqual(box.x, 0.)
+        self.assertTrue(timeline.completed)
+        timeline.step(1.)
+        self.assertAlmostEqual(box.x, 0.)
+
+    def test_yoyo_with_repeat_ping_pongs(self):
+        box = Box()
+        timeline = TimelineNode(Tween(box, "x", 10., duration=1., easing=_linear), repeat=True, yoyo=True)
+        self.assertEqual(timeline.duration, inf)
+        for expected in (10., 0., 10., 0.):
+            timeline.step(1.)
+            self.assertAlmostEqual(box.x, expected)
+        self.assertFalse(timeline.completed)
+
+    def test_repeat_count_with_yoyo(self):
+        box = Box()
+        timeline = TimelineNode(Tween(box, "x", 10., duration=1., easing=_linear), repeat=3, yoyo=True, remove_on_complete=False)
+        timeline.step(3.)
+        self.assertAlmostEqual(box.x, 10.)
+        self.assertTrue(timeline.completed)
+
+if __name__ == "__main__":
+    unittest.main()